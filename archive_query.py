@@ -0,0 +1,52 @@
+import argparse
+from datetime import datetime
+import json
+import os
+
+from dotenv import load_dotenv
+
+from src.services.ad_archive import ArchiveReader
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _to_kopecks(value: float | None) -> int | None:
+    return None if value is None else int(value * 100)
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Поиск по архиву объявлений, собранному мониторингом.")
+    parser.add_argument("--dir", default=os.getenv("ARCHIVE_DIR", "").strip() or "data/archive")
+    parser.add_argument("--target", type=int, help="ID категории (target_id).")
+    parser.add_argument("--since", type=_parse_time, help="Начало периода, ISO (2024-05-01 или 2024-05-01T12:00).")
+    parser.add_argument("--until", type=_parse_time, help="Конец периода, ISO.")
+    parser.add_argument("--min-price", type=float, help="Минимальная цена, р.")
+    parser.add_argument("--max-price", type=float, help="Максимальная цена, р.")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON Lines.")
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.dir)
+    records = reader.query(
+        target_id=args.target,
+        since=args.since,
+        until=args.until,
+        min_price=_to_kopecks(args.min_price),
+        max_price=_to_kopecks(args.max_price),
+    )
+    for count, record in enumerate(records, start=1):
+        if args.json:
+            print(json.dumps({"target_id": record.target_id, "seen_at": record.seen_at, **record.ad}, ensure_ascii=False))
+        else:
+            seen_at = datetime.fromtimestamp(record.seen_at).strftime("%Y-%m-%d %H:%M")
+            price = f"{record.ad.get('price_byn', 0) / 100:,.0f}".replace(",", " ")
+            print(f"{seen_at}  #{record.target_id}  {price:>10} р.  {record.ad.get('subject')}  {record.ad.get('link')}")
+        if args.limit and count >= args.limit:
+            break
+
+
+if __name__ == "__main__":
+    main()
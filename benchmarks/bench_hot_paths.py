@@ -0,0 +1,210 @@
+import argparse
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks.corpus import TARGET_SOURCES, ad_payloads
+from src.handlers.watchlist import _parse_target_source
+from src.models.ad import Ad
+from src.models.search_config import SearchConfig
+from src.models.search_location import SearchLocation
+from src.models.search_target import SearchTarget
+from src.services.kufar_parser import KufarParser
+from src.services.location_manager import LocationManager
+
+DEFAULT_BASELINE = "benchmarks/hot_paths_baseline.json"
+DEFAULT_LOCATIONS = "data/locations.json"
+MIN_REPEAT_TIME = 0.02
+REFERENCE_INPUTS = [{f"key{index}": f"value{index * item}" for index in range(8)} for item in range(64)]
+
+
+def _parse_source(text: str) -> Any:
+    try:
+        return _parse_target_source(text)
+    except ValueError:
+        return None
+
+
+def build_cases(payloads: list[dict[str, Any]]) -> dict[str, tuple[Callable[[Any], Any], list[Any]]]:
+    locations = LocationManager(DEFAULT_LOCATIONS)
+    parser = KufarParser({}, locations=locations)
+    ads = [Ad.from_payload(payload) for payload in payloads]
+    coordinates = [ad.coordinates for ad in ads if ad.coordinates]
+    prices = [payload.get(key) for payload in payloads for key in ("price_byn", "price_usd")]
+    config = SearchConfig()
+    targets = [
+        SearchTarget(target_id=1, name="Телефоны", category_id=17010),
+        SearchTarget(
+            target_id=2,
+            name="Квартиры",
+            category_id=1010,
+            extra_params={"cur": "USD", "prc": "r:30000,90000", "rms": "v.or:1,2", "rgn": "7"},
+        ),
+        SearchTarget(
+            target_id=3,
+            name="Ноутбуки",
+            category_id=16040,
+            locations=[SearchLocation(rgn=7, ar=22, label="Минск"), SearchLocation(rgn=1, label="Брест")],
+        ),
+    ]
+    return {
+        "Ad.from_payload": (Ad.from_payload, payloads),
+        "KufarParser.format_caption": (parser.format_caption, ads),
+        "KufarParser.get_all_photos": (parser.get_all_photos, ads),
+        "KufarParser._parse_numeric_price": (parser._parse_numeric_price, prices),
+        "KufarParser.build_url": (lambda target: parser.build_url(config, target), targets),
+        "_parse_target_source": (_parse_source, list(TARGET_SOURCES)),
+        "LocationManager.describe": (locations.describe, coordinates),
+    }
+
+
+def _reference_work(item: dict[str, str]) -> str:
+    # Эталонная чисто-питоновская нагрузка: время функций считается в её единицах,
+    # поэтому частота CPU и фоновая нагрузка сокращаются при сравнении с baseline.
+    return "|".join(f"{key}={value}" for key, value in sorted(item.items()))
+
+
+def _run_pass(function: Callable[[Any], Any], inputs: list[Any]) -> None:
+    for item in inputs:
+        function(item)
+
+
+def _calibrate(function: Callable[[Any], Any], inputs: list[Any]) -> int:
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            _run_pass(function, inputs)
+        if time.perf_counter() - started >= MIN_REPEAT_TIME:
+            return number
+        number *= 2
+
+
+def _timed_pass(function: Callable[[Any], Any], inputs: list[Any], number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        _run_pass(function, inputs)
+    return (time.perf_counter() - started) / (number * len(inputs))
+
+
+def measure(function: Callable[[Any], Any], inputs: list[Any], repeat: int) -> dict[str, float]:
+    number = _calibrate(function, inputs)
+    reference_number = _calibrate(_reference_work, REFERENCE_INPUTS)
+
+    timings: list[float] = []
+    ratios: list[float] = []
+    for _ in range(repeat):
+        # Замеры функции и эталона чередуются, чтобы оба попадали в одинаковые условия.
+        reference = _timed_pass(_reference_work, REFERENCE_INPUTS, reference_number)
+        elapsed = _timed_pass(function, inputs, number)
+        timings.append(elapsed)
+        ratios.append(elapsed / reference)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        retained = [function(item) for item in inputs]
+        _, peak = tracemalloc.get_traced_memory()
+        del retained
+    finally:
+        tracemalloc.stop()
+    return {
+        "ns_per_call": statistics.median(timings) * 1e9,
+        "relative": statistics.median(ratios),
+        "peak_bytes_per_call": (peak - before) / len(inputs),
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if "relative" not in previous:
+            regressions.append(f"{name}: baseline старого формата, пересохрани его с --save")
+            continue
+        if current["relative"] > previous["relative"] * (1 + time_tolerance):
+            regressions.append(
+                f"{name}: время {previous['relative']:.2f} -> {current['relative']:.2f} эталонов "
+                f"({previous['ns_per_call']:.0f} -> {current['ns_per_call']:.0f} нс/вызов)"
+            )
+        if current["peak_bytes_per_call"] > previous["peak_bytes_per_call"] * (1 + memory_tolerance) + 64:
+            regressions.append(
+                f"{name}: память {previous['peak_bytes_per_call']:.0f} -> {current['peak_bytes_per_call']:.0f} байт/вызов"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Микробенчмарки горячих функций парсера с сохранённым baseline и проверкой регрессий."
+    )
+    parser.add_argument("responses", nargs="*", help="Записанные JSON-ответы поиска (по умолчанию синтетика).")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Записать текущие результаты как baseline.")
+    parser.add_argument("--repeat", type=int, default=15, help="Повторов; берётся медиана.")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    parser.add_argument("--only", help="Запустить только функции, в имени которых есть эта строка.")
+    args = parser.parse_args()
+
+    payloads = ad_payloads(args.responses)
+    cases = build_cases(payloads)
+    if args.only:
+        cases = {name: case for name, case in cases.items() if args.only in name}
+    print(f"Объявлений в корпусе: {len(payloads)}")
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["cases"] if baseline_path.exists() else {}
+
+    results: dict[str, dict[str, float]] = {}
+    for name, (function, inputs) in cases.items():
+        results[name] = measure(function, inputs, args.repeat)
+        previous = baseline.get(name)
+        delta = (
+            f"  x{previous['relative'] / results[name]['relative']:.2f}"
+            if previous and "relative" in previous
+            else ""
+        )
+        print(
+            f"{name:<34} {results[name]['ns_per_call']:9.0f} нс/вызов "
+            f"{results[name]['peak_bytes_per_call']:8.0f} байт/вызов{delta}"
+        )
+
+    if args.save:
+        payload = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cases": {**baseline, **results},
+        }
+        baseline_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Baseline записан в {baseline_path}")
+        return
+
+    if not baseline:
+        print(f"Baseline {baseline_path} не найден, запусти с --save.")
+        sys.exit(2)
+
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print("\nРегрессии:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nРегрессий нет.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.corpus import synthetic_search_response
+from benchmarks.fake_bot_api import BENCH_TOKEN, FakeBotApi
+from src.app_context import AppContext
+from src.services.kufar_parser import KufarParser
+from src.services.location_manager import LocationManager
+from src.services.monitoring import MonitoringService
+from src.services.transport import TransportResponse
+
+BENCH_USER_ID = 1000
+
+
+class BurstTransport:
+    def __init__(self, burst_size: int):
+        self.burst_size = burst_size
+        self._body = b""
+        self.set_burst(0)
+
+    def set_burst(self, burst: int) -> None:
+        page = synthetic_search_response(count=self.burst_size, seed=burst)
+        self._body = json.dumps(page, ensure_ascii=False).encode("utf-8")
+
+    async def get(self, url: str) -> TransportResponse:
+        if "/search-api/" not in url:
+            return TransportResponse(status=404, body=b"")
+        return TransportResponse(status=200, body=self._body)
+
+    async def head(self, url: str, timeout: float) -> TransportResponse:
+        return TransportResponse(status=200, body=b"", content_type="image/jpeg")
+
+    async def close(self) -> None:
+        return None
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(share * (len(ordered) - 1)))]
+
+
+async def bench(args: argparse.Namespace) -> None:
+    api = FakeBotApi(
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        chat_limit=args.chat_limit,
+        chat_window=args.chat_window,
+    )
+    base_url = await api.start()
+    bot = Bot(token=BENCH_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    transport = BurstTransport(args.burst_size)
+    location_manager = LocationManager(args.locations)
+    context = AppContext(
+        location_manager=location_manager,
+        parser=KufarParser({}, transport=transport, locations=location_manager),
+    )
+    context.add_target(name="Бенчмарк", category_id=17010)
+    monitoring = MonitoringService(
+        context=context,
+        bot=bot,
+        config=SimpleNamespace(user_id=BENCH_USER_ID, check_interval=0),
+    )
+    monitoring.send_delay = args.send_delay
+
+    latencies: list[float] = []
+    alerts_total = 0
+    busy_time = 0.0
+    try:
+        await monitoring.update_all_baselines()
+        for burst in range(1, args.bursts + 1):
+            transport.set_burst(burst)
+            sent_before = len(api.sent)
+            started = time.perf_counter()
+            alerts = await monitoring.run_cycle()
+            elapsed = time.perf_counter() - started
+            busy_time += elapsed
+            alerts_total += alerts
+            latencies.extend(request.at - started for request in api.sent[sent_before:])
+            print(f"Пачка {burst}: {alerts} уведомлений за {elapsed:.2f} с")
+    finally:
+        await bot.session.close()
+        await api.close()
+
+    print()
+    print(f"Уведомлений: {alerts_total}, доставлено: {len(latencies)}")
+    print(f"Пропускная способность: {alerts_total / busy_time if busy_time else 0:.1f} увед./с")
+    if latencies:
+        print(
+            f"Задержка доставки от начала цикла: p50 {statistics.median(latencies):.2f} с, "
+            f"p99 {percentile(latencies, 0.99):.2f} с, max {max(latencies):.2f} с"
+        )
+    print(
+        f"Ответов 429: {api.throttled}, повторов отправки: {monitoring.send_retries}, "
+        f"ожидание retry_after Σ {monitoring.retry_wait_total:.0f} с"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Пропускная способность уведомлений MonitoringService через локальный фейковый Bot API."
+    )
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--burst-size", type=int, default=30, help="Новых объявлений в каждой пачке.")
+    parser.add_argument("--send-delay", type=float, default=0.0, help="MonitoringService.send_delay, с.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Задержка ответа Bot API, с.")
+    parser.add_argument("--throttle-rate", type=float, default=0.05, help="Доля запросов, получающих 429.")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--chat-limit", type=int, default=0, help="Сообщений в чат за окно; 0 - без лимита.")
+    parser.add_argument("--chat-window", type=float, default=1.0)
+    parser.add_argument("--locations", default="data/locations.json")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.corpus import search_payloads
+from src.models.ad import Ad
+from src.services.json_decoder import SearchDecoder, orjson
+
+
+def _baseline_decode(raw: bytes) -> list[Ad]:
+    data = json.loads(raw.decode("utf-8"))
+    return [Ad.from_payload(ad) for ad in data.get("ads", [])]
+
+
+def _decoder_decode(decoder: SearchDecoder):
+    def decode(raw: bytes) -> list[Ad]:
+        data = decoder.decode_search(raw)
+        return [Ad.from_payload(ad) for ad in data.get("ads", [])]
+
+    return decode
+
+
+def _measure(decode, payloads: list[bytes], repeat: int, number: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            for raw in payloads:
+                decode(raw)
+        timings.append((time.perf_counter() - started) / (number * len(payloads)))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Микробенчмарк декодирования ответов поиска Kufar.")
+    parser.add_argument("responses", nargs="*", help="Записанные JSON-ответы поиска (по умолчанию синтетика).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    payloads = search_payloads(args.responses)
+    total_bytes = sum(len(raw) for raw in payloads)
+    print(f"Ответов: {len(payloads)}, средний размер: {total_bytes // len(payloads)} байт")
+
+    cases = {"json.loads(text) + Ad": _baseline_decode}
+    cases["SearchDecoder(json)"] = _decoder_decode(SearchDecoder(backend="json"))
+    if orjson is not None:
+        cases["SearchDecoder(orjson)"] = _decoder_decode(SearchDecoder(backend="orjson"))
+    else:
+        print("orjson не установлен, быстрый backend пропущен.")
+
+    baseline = None
+    for name, decode in cases.items():
+        timings = _measure(decode, payloads, args.repeat, args.number)
+        best = min(timings)
+        baseline = baseline or best
+        print(
+            f"{name:<36} best {best * 1e6:9.1f} мкс  "
+            f"median {statistics.median(timings) * 1e6:9.1f} мкс  x{baseline / best:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import time
+
+STARTED_AT = time.perf_counter()
+
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+import tempfile
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.corpus import synthetic_search_response
+from benchmarks.fake_bot_api import BENCH_TOKEN, FakeBotApi
+from src.app import run
+from src.config import DEFAULT_USER_AGENT, AppConfig
+from src.services.transport import TransportResponse
+
+IMPORTED_AT = time.perf_counter()
+BENCH_USER_ID = 1000
+
+
+class SlowSearchTransport:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self._body = json.dumps(synthetic_search_response(count=30), ensure_ascii=False).encode("utf-8")
+
+    async def get(self, url: str) -> TransportResponse:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return TransportResponse(status=200, body=self._body)
+
+    async def head(self, url: str, timeout: float) -> TransportResponse:
+        return TransportResponse(status=200, body=b"", content_type="image/jpeg")
+
+    async def close(self) -> None:
+        return None
+
+
+def write_targets(path: Path, count: int) -> None:
+    targets = [
+        {"target_id": index, "name": f"Категория {index}", "category_id": 17010, "extra_params": {"prn": str(index)}}
+        for index in range(1, count + 1)
+    ]
+    path.write_text(json.dumps({"targets": targets}, ensure_ascii=False), encoding="utf-8")
+
+
+async def bench(args: argparse.Namespace, log_level: int) -> None:
+    api = FakeBotApi()
+    base_url = await api.start()
+    api.push_message(BENCH_USER_ID, "/start")
+
+    with tempfile.TemporaryDirectory() as directory:
+        targets_file = Path(directory) / "targets.json"
+        write_targets(targets_file, args.targets)
+        config = AppConfig(
+            bot_token=BENCH_TOKEN,
+            user_id=BENCH_USER_ID,
+            check_interval=3600,
+            locations_file=args.locations,
+            targets_file=str(targets_file),
+            kufar_auth_token=None,
+            user_agent=DEFAULT_USER_AGENT,
+            repost_window=86400,
+            stall_timeout=300,
+            archive_dir=None,
+            capture_file=None,
+            search_index_file=None,
+        )
+        bot = Bot(token=BENCH_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+        transport = SlowSearchTransport(args.latency)
+
+        run_started = time.perf_counter()
+        app_task = asyncio.create_task(run(config, bot=bot, transport=transport, log_level=log_level))
+        try:
+            async with asyncio.timeout(args.timeout):
+                await api.first_poll.wait()
+                await api.wait_sent(1)
+        finally:
+            app_task.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                pass
+            await api.close()
+
+    print(f"Импорт модулей: {(IMPORTED_AT - STARTED_AT) * 1000:.0f} мс")
+    print(f"Первый getUpdates: {(api.first_poll_at - run_started) * 1000:.0f} мс после run()")
+    print(f"Первый ответ на апдейт: {(api.sent[0].at - run_started) * 1000:.0f} мс после run()")
+    print(
+        f"Категорий: {args.targets}, задержка поиска {args.latency * 1000:.0f} мс, "
+        f"запросов к Kufar до ответа: {transport.requests}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Время запуска бота: до первого опроса Telegram и до первого обработанного апдейта."
+    )
+    parser.add_argument("--targets", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.4, help="Задержка ответа поиска Kufar, с.")
+    parser.add_argument("--locations", default="data/locations.json")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    # run() сам настраивает корневой логгер, поэтому уровень передаётся ему, а не basicConfig.
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    if not args.verbose:
+        logging.getLogger("aiogram").setLevel(logging.CRITICAL)
+    asyncio.run(bench(args, log_level))
+
+
+if __name__ == "__main__":
+    main()
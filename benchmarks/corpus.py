@@ -0,0 +1,138 @@
+import base64
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+SUBJECTS = (
+    "iPhone 13 128GB",
+    "Samsung Galaxy S21",
+    "Xiaomi Redmi Note 10 Pro",
+    "iPhone 11 64 ГБ, отличное состояние",
+    "Google Pixel 7",
+    "iPhone 14 Pro Max 256",
+)
+REGIONS = (("Минск", "Минск"), ("Минская область", "Борисов"), ("Гомельская область", "Гомель"))
+
+
+def synthetic_ad(rng: random.Random, ad_id: int) -> dict[str, Any]:
+    region, area = rng.choice(REGIONS)
+    price = rng.randrange(20000, 500000, 500)
+    return {
+        "ad_id": ad_id,
+        "ad_link": f"https://www.kufar.by/item/{ad_id}",
+        "subject": rng.choice(SUBJECTS),
+        "price_byn": str(price),
+        "price_usd": str(price * 10 // 33),
+        "currency": "BYR",
+        "list_time": f"2024-05-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z",
+        "body": "Продаю телефон в хорошем состоянии. " * rng.randint(1, 12),
+        "body_short": "Продаю телефон в хорошем состоянии.",
+        "category": "17010",
+        "company_ad": rng.random() < 0.2,
+        "phone_hidden": rng.random() < 0.5,
+        "paid_services": {"halva": False, "highlight": rng.random() < 0.1, "polepos": False, "ribbons": None},
+        "remuneration_type": "1",
+        "message_id": f"{ad_id:x}",
+        "images": [
+            {
+                "id": f"{ad_id}{index}",
+                "media_storage": "rms",
+                "path": f"adim1/{ad_id % 97:02d}/{ad_id}_{index}.jpg",
+                "yams_storage": False,
+            }
+            for index in range(rng.randint(0, 10))
+        ],
+        "account_id": str(rng.randint(1000000, 9999999)),
+        "account_parameters": [
+            {"pl": "Имя", "vl": "Иван", "p": "name", "v": "Иван", "pu": ""},
+            {"pl": "Контактное лицо", "vl": "Иван", "p": "contact_person", "v": "Иван", "pu": ""},
+        ],
+        "ad_parameters": [
+            {"pl": "Область", "vl": region, "p": "region", "v": "7", "pu": ""},
+            {"pl": "Город / Район", "vl": area, "p": "area", "v": "22", "pu": ""},
+            {"pl": "Категория", "vl": "Мобильные телефоны", "p": "category", "v": "17010", "pu": ""},
+            {"pl": "Производитель", "vl": "Apple", "p": "phones_brand", "v": "1", "pu": ""},
+            {"pl": "Модель", "vl": "iPhone 13", "p": "phones_model", "v": "13", "pu": ""},
+            {"pl": "Встроенная память", "vl": "128 ГБ", "p": "phablet_phones_memory", "v": "7", "pu": ""},
+            {"pl": "Цвет", "vl": "Черный", "p": "phablet_phones_color", "v": "1", "pu": ""},
+            {"pl": "Состояние", "vl": "Б/у", "p": "condition", "v": "1", "pu": ""},
+            {"pl": "Координаты", "vl": "", "p": "coordinates", "v": [27.56 + rng.random(), 53.9 + rng.random()]},
+            {"pl": "Возможна доставка", "vl": ["Курьером", "Почтой"], "p": "delivery", "v": [1, 2], "pu": ""},
+        ],
+    }
+
+
+def page_token(page: int) -> str:
+    # Как у Kufar: base64 от {"t":"abs","f":true,"p":N}, где N - номер страницы.
+    payload = json.dumps({"t": "abs", "f": True, "p": page}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def synthetic_search_response(count: int = 50, seed: int = 0, page: int = 1) -> dict[str, Any]:
+    rng = random.Random(seed)
+    first_id = 200000000 + seed * 1000 + (page - 1) * count
+    return {
+        "ads": [synthetic_ad(rng, first_id + index) for index in range(count)],
+        "pagination": {
+            "pages": [
+                {"label": "prev", "num": page - 1, "token": page_token(page - 1) if page > 1 else None},
+                {"label": "self", "num": page, "token": page_token(page) if page > 1 else None},
+                {"label": "next", "num": page + 1, "token": page_token(page + 1)},
+            ]
+        },
+        "total": count * 40,
+    }
+
+
+def search_payloads(paths: list[str] | None = None, synthetic_count: int = 5) -> list[bytes]:
+    payloads = [Path(path).read_bytes() for path in paths or []]
+    if not payloads:
+        payloads = [
+            json.dumps(synthetic_search_response(seed=seed), ensure_ascii=False).encode("utf-8")
+            for seed in range(synthetic_count)
+        ]
+    return payloads
+
+
+def malformed_ads(seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    base = synthetic_ad(rng, 300000000 + seed)
+    return [
+        {},
+        {"ad_id": "not-a-number", "subject": None, "price_byn": "abc", "price_usd": -5},
+        {**base, "images": None, "ad_parameters": None, "account_parameters": "broken"},
+        {**base, "images": {"gallery": {"images": ["https://rms.kufar.by/v1/gallery/a.jpg", 42]}}},
+        {**base, "images": [{"no_path": True}, "ftp://bad", "https://rms.kufar.by/v1/gallery/b.jpg"]},
+        {**base, "ad_parameters": {"1": {"p": "region", "vl": ["Минск", 7]}, "2": "junk"}},
+        {**base, "body": {"html": "<br>"}, "description": 12345},
+        {**base, "body": "Очень длинное описание. " * 400},
+        {**base, "price_byn": 0, "price_usd": None, "price": "Договорная"},
+        {**base, "price_byn": "99999999999", "list_time": None},
+        {"adId": 1, "adLink": "https://www.kufar.by/item/1", "priceByn": "1500", "adParams": {}},
+    ]
+
+
+def ad_payloads(paths: list[str] | None = None, synthetic_count: int = 2, malformed_count: int = 3) -> list[dict[str, Any]]:
+    payloads: list[dict[str, Any]] = []
+    for raw in search_payloads(paths, synthetic_count=synthetic_count):
+        ads = json.loads(raw).get("ads")
+        payloads.extend(ad for ad in ads or [] if isinstance(ad, dict))
+    for seed in range(malformed_count):
+        payloads.extend(malformed_ads(seed))
+    return payloads
+
+
+TARGET_SOURCES = (
+    "17010",
+    "cat=17010",
+    "https://www.kufar.by/l/mobilnye-telefony?cat=17010&prn=17000&rgn=7&ar=22&sort=lst.d",
+    "https://re.kufar.by/l/minsk/kupit/kvartiru?cat=1010&cur=USD&prc=r%3A30000%2C90000&rms=v.or%3A1%2C2",
+    "https://www.kufar.by/l?query=iphone%2013&cat=17010&oph=1&cmp=0&size=30",
+    "",
+    "0",
+    "cat=abc",
+    "https://www.kufar.by/l/mobilnye-telefony",
+    "https://www.kufar.by/l?cat=",
+    "просто текст",
+)
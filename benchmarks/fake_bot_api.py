@@ -0,0 +1,172 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import itertools
+import json
+import math
+import random
+import time
+from typing import Any
+
+from aiohttp import web
+
+BENCH_TOKEN = "123456:bench-token"
+THROTTLED_METHODS = frozenset({"sendMessage", "sendPhoto", "sendMediaGroup", "editMessageMedia", "editMessageText"})
+
+
+@dataclass(frozen=True, slots=True)
+class SentRequest:
+    method: str
+    at: float
+    data: dict[str, Any]
+
+
+class FakeBotApi:
+    def __init__(
+        self,
+        poll_timeout: float = 0.5,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        chat_limit: int = 0,
+        chat_window: float = 1.0,
+        seed: int = 0,
+    ):
+        self.poll_timeout = poll_timeout
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.chat_limit = chat_limit
+        self.chat_window = chat_window
+        self.first_poll_at: float | None = None
+        self.first_poll = asyncio.Event()
+        self.sent: list[SentRequest] = []
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._chat_sends: dict[str, deque[float]] = {}
+        self._sent_event = asyncio.Event()
+        self._updates: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    def push_message(self, user_id: int, text: str) -> None:
+        update_id = next(self._update_ids)
+        self._updates.put_nowait(
+            {
+                "update_id": update_id,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+                    "text": text,
+                    "entities": (
+                        [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+                        if text.startswith("/")
+                        else []
+                    ),
+                },
+            }
+        )
+
+    async def wait_sent(self, count: int = 1, timeout: float = 30) -> None:
+        async with asyncio.timeout(timeout):
+            while len(self.sent) < count:
+                self._sent_event.clear()
+                await self._sent_event.wait()
+
+    async def _get_updates(self) -> list[dict[str, Any]]:
+        if self.first_poll_at is None:
+            self.first_poll_at = time.perf_counter()
+            self.first_poll.set()
+        try:
+            first = await asyncio.wait_for(self._updates.get(), self.poll_timeout)
+        except TimeoutError:
+            return []
+        updates = [first]
+        while not self._updates.empty():
+            updates.append(self._updates.get_nowait())
+        return updates
+
+    def _throttle(self, chat_id: str) -> int | None:
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            return self.retry_after
+        if not self.chat_limit:
+            return None
+
+        now = time.monotonic()
+        sends = self._chat_sends.setdefault(chat_id, deque())
+        while sends and now - sends[0] >= self.chat_window:
+            sends.popleft()
+        if len(sends) >= self.chat_limit:
+            return max(1, math.ceil(sends[0] + self.chat_window - now))
+        sends.append(now)
+        return None
+
+    def _message_result(self, method: str, data: dict[str, Any]) -> dict[str, Any]:
+        result: dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(data.get("chat_id", 0)), "type": "private"},
+        }
+        if method in {"sendPhoto", "editMessageMedia"}:
+            result["photo"] = [{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}]
+            result["caption"] = data.get("caption", "")
+        else:
+            result["text"] = data.get("text", "")
+        return result
+
+    def _result(self, method: str, data: dict[str, Any]) -> Any:
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "sendMediaGroup":
+            media = json.loads(data.get("media") or "[]")
+            return [self._message_result("sendPhoto", data) for _ in media]
+        if method in {"sendMessage", "sendPhoto", "editMessageMedia", "editMessageText"}:
+            return self._message_result(method, data)
+        return True
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates()})
+
+        if self.latency and method not in {"getMe", "deleteWebhook"}:
+            await asyncio.sleep(self.latency)
+        if method in THROTTLED_METHODS:
+            retry_after = self._throttle(str(data.get("chat_id", "")))
+            if retry_after is not None:
+                self.throttled += 1
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": f"Too Many Requests: retry after {retry_after}",
+                        "parameters": {"retry_after": retry_after},
+                    },
+                    status=429,
+                )
+
+        result = self._result(method, data)
+        if method.startswith(("send", "edit")):
+            self.sent.append(SentRequest(method=method, at=time.perf_counter(), data=data))
+            self._sent_event.set()
+        return web.json_response({"ok": True, "result": result})
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import cProfile
+import pstats
+import time
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlparse
+
+from src.app_context import AppContext
+from src.models.search_config import SearchConfig
+from src.services.kufar_parser import DEFAULT_SEARCH_PARAMS, KufarParser
+from src.services.location_manager import LocationManager
+from src.services.monitoring import MonitoringService
+from src.services.traffic_capture import ReplayTransport
+
+
+class NullBot:
+    def __init__(self) -> None:
+        self.sent = 0
+
+    async def send_photo(self, *args, **kwargs) -> None:
+        self.sent += 1
+
+    async def send_message(self, *args, **kwargs) -> None:
+        return None
+
+
+def build_context(transport: ReplayTransport, locations_file: str) -> AppContext:
+    location_manager = LocationManager(locations_file)
+    context = AppContext(
+        location_manager=location_manager,
+        parser=KufarParser({}, transport=transport, locations=location_manager),
+        search_config=SearchConfig(),
+    )
+    for url in transport.search_urls:
+        params = dict(parse_qsl(urlparse(url).query))
+        category_id = int(params.pop("cat", 0) or 0)
+        if category_id <= 0:
+            continue
+        if "rgn" in params:
+            context.search_config.rgn = int(params.pop("rgn"))
+        if "ar" in params:
+            context.search_config.ar = int(params.pop("ar"))
+        extra_params = {key: value for key, value in params.items() if DEFAULT_SEARCH_PARAMS.get(key) != value}
+        context.add_target(name=f"cat {category_id}", category_id=category_id, extra_params=extra_params)
+    return context
+
+
+async def replay(args: argparse.Namespace) -> None:
+    transport = ReplayTransport(args.cassette, speed=args.speed)
+    context = build_context(transport, args.locations)
+    bot = NullBot()
+    config = SimpleNamespace(user_id=0, check_interval=0)
+    monitoring = MonitoringService(context=context, bot=bot, config=config)
+    monitoring.send_delay = 0
+
+    print(f"Записей: {len(transport.records)}, категорий: {len(context.targets)}")
+    started = time.perf_counter()
+    await monitoring.update_all_baselines()
+    print(f"Baseline: {time.perf_counter() - started:.3f} с")
+
+    for cycle in range(1, args.cycles + 1):
+        started = time.perf_counter()
+        alerts = await monitoring.run_cycle()
+        print(f"Цикл {cycle}: {alerts} уведомлений за {time.perf_counter() - started:.3f} с")
+    print(f"Отправлено: {bot.sent}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Прогон MonitoringService на записанной кассете трафика Kufar.")
+    parser.add_argument("cassette")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--speed", type=float, default=0, help="1 - реальная скорость, 0 - без задержек.")
+    parser.add_argument("--locations", default="data/locations.json")
+    parser.add_argument("--profile", action="store_true", help="Показать топ функций cProfile.")
+    args = parser.parse_args()
+
+    if not args.profile:
+        asyncio.run(replay(args))
+        return
+
+    profiler = cProfile.Profile()
+    profiler.runcall(asyncio.run, replay(args))
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
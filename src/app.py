@@ -2,52 +2,172 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from src.app_context import AppContext
-from src.config import load_config
+from src.config import AppConfig, load_config
+from src.handlers.admin import build_admin_router
 from src.handlers.ads import build_ads_router
 from src.handlers.location import build_location_router
 from src.handlers.watchlist import build_watchlist_router
+from src.services.ad_archive import AdArchive
 from src.services.kufar_parser import KufarParser
 from src.services.location_manager import LocationManager
+from src.services.logging_setup import setup_logging, stop_logging
+from src.services.memory_governor import MemoryGovernor
 from src.services.monitoring import MonitoringService
+from src.services.profiler import SamplingProfiler
+from src.services.repost_index import RepostIndex
+from src.services.supervisor import LoopLagMonitor, TaskSupervisor
 from src.services.target_storage import TargetStorage
+from src.services.traffic_capture import RecordingTransport
+from src.services.transport import HttpTransport, Transport
 
 
-async def run() -> None:
-    logging.basicConfig(level=logging.INFO)
-    config = load_config()
+def _evict_idle_fsm_records(storage: MemoryStorage, count: int) -> int:
+    # Записи без состояния и данных остаются в defaultdict после state.clear().
+    idle = [key for key, record in storage.storage.items() if record.state is None and not record.data][:count]
+    for key in idle:
+        storage.storage.pop(key, None)
+    return len(idle)
 
+
+def _register_caches(governor: MemoryGovernor, context: AppContext, storage: MemoryStorage) -> None:
+    governor.register(
+        "fsm",
+        lambda: storage.storage.items(),
+        lambda count: _evict_idle_fsm_records(storage, count),
+        0,
+    )
+    governor.register(
+        "parser.details",
+        context.parser.detail_cache_entries,
+        context.parser.evict_detail_cache,
+        10,
+    )
+    governor.register("photo_resolver", context.photo_resolver.entries, context.photo_resolver.evict_oldest, 10)
+    governor.register("ad_photos_cache", lambda: context.ad_photos_cache.items(), context.evict_photo_cache, 20)
+    governor.register(
+        "browsing_sessions",
+        context.browsing_sessions.entries,
+        context.browsing_sessions.evict_oldest,
+        30,
+    )
+    governor.register("search_index", context.search_index.entries, context.search_index.evict_oldest, 40)
+    governor.register("search_index.tokens", context.search_index.token_entries)
+    governor.register("repost_index", context.repost_index.entries, context.repost_index.evict_oldest, 50)
+    governor.register("ad_states", context.ad_states.entries, context.ad_states.evict_oldest, 60)
+    governor.register("seen_ads", lambda: context.seen_ads_by_target.items())
+
+
+async def run(
+    config: AppConfig | None = None,
+    bot: Bot | None = None,
+    transport: Transport | None = None,
+    log_level: int = logging.INFO,
+) -> None:
+    config = config or load_config()
+    log_listener = setup_logging(level=log_level, json_output=config.log_json)
+    try:
+        await _run(config, bot, transport)
+    finally:
+        stop_logging(log_listener)
+
+
+async def _run(config: AppConfig, bot: Bot | None, transport: Transport | None) -> None:
     location_manager = LocationManager(config.locations_file)
-    parser = KufarParser(config.headers)
-    context = AppContext(location_manager=location_manager, parser=parser)
+    transport = transport or HttpTransport(config.headers)
+    if config.capture_file:
+        logging.info("Запись трафика Kufar в %s", config.capture_file)
+        transport = RecordingTransport(transport, config.capture_file)
+    parser = KufarParser(config.headers, transport=transport, locations=location_manager)
+    context = AppContext(
+        location_manager=location_manager,
+        parser=parser,
+        repost_index=RepostIndex(config.repost_window),
+    )
+    if config.search_index_file:
+        context.search_index.load(config.search_index_file)
     target_storage = TargetStorage(config.targets_file)
     targets_file_exists = target_storage.path.exists()
     target_storage.load(context)
     if not context.targets and not targets_file_exists:
         context.add_target(name="iPhone (по умолчанию)", category_id=17010)
-        target_storage.save(context)
+        target_storage.schedule_save(context)
 
-    bot = Bot(token=config.bot_token)
-    dp = Dispatcher(storage=MemoryStorage())
-    monitoring_service = MonitoringService(context=context, bot=bot, config=config)
+    if bot is None:
+        session = None
+        if config.telegram_api_url:
+            logging.info("Bot API: %s", config.telegram_api_url)
+            session = AiohttpSession(api=TelegramAPIServer.from_base(config.telegram_api_url))
+        bot = Bot(token=config.bot_token, session=session)
+    fsm_storage = MemoryStorage()
+    dp = Dispatcher(storage=fsm_storage)
+    memory_governor = MemoryGovernor(budget=config.memory_budget_mb * 2**20)
+    _register_caches(memory_governor, context, fsm_storage)
+    archive = AdArchive(config.archive_dir) if config.archive_dir else None
+    monitoring_service = MonitoringService(context=context, bot=bot, config=config, archive=archive)
 
-    dp.include_router(build_location_router(context, monitoring_service))
+    lag_monitor = LoopLagMonitor()
+    monitoring_supervisor = TaskSupervisor(
+        name="monitoring",
+        factory=monitoring_service.background_monitoring,
+        heartbeat=lambda: monitoring_service.last_heartbeat,
+        stall_timeout=config.check_interval + config.stall_timeout,
+    )
+
+    dp.include_router(
+        build_admin_router(
+            context,
+            config,
+            SamplingProfiler(),
+            monitoring_service,
+            lag_monitor,
+            monitoring_supervisor,
+            memory_governor,
+        )
+    )
+    dp.include_router(build_location_router(context, monitoring_service, target_storage))
     dp.include_router(build_watchlist_router(context, monitoring_service, target_storage))
     dp.include_router(build_ads_router(context, bot))
 
-    await monitoring_service.update_all_baselines()
-    monitoring_task = asyncio.create_task(monitoring_service.background_monitoring())
+    background_tasks = [
+        monitoring_service.start_baselines(),
+        asyncio.create_task(lag_monitor.run()),
+        asyncio.create_task(monitoring_supervisor.run()),
+        asyncio.create_task(memory_governor.run()),
+    ]
+    if archive:
+        background_tasks.append(asyncio.create_task(archive.run()))
+    if config.targets_reload_interval > 0:
+        background_tasks.append(
+            asyncio.create_task(
+                target_storage.watch(
+                    context,
+                    monitoring_service.apply_targets_diff,
+                    interval=config.targets_reload_interval,
+                )
+            )
+        )
 
     try:
         await dp.start_polling(bot)
     finally:
-        monitoring_task.cancel()
-        try:
-            await monitoring_task
-        except asyncio.CancelledError:
-            pass
+        for task in background_tasks:
+            task.cancel()
+        for task in background_tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        await target_storage.close()
+        if archive:
+            await archive.flush()
+        if config.search_index_file:
+            await context.search_index.save(config.search_index_file)
 
         await parser.close()
         await bot.session.close()
@@ -1,10 +1,16 @@
-from dataclasses import dataclass, field
+import asyncio
+from dataclasses import dataclass, field, replace
 from typing import Any
 
 from src.models.search_config import SearchConfig
 from src.models.search_target import SearchTarget
+from src.services.ad_search_index import AdSearchIndex
+from src.services.ad_state_store import AdStateStore
+from src.services.browsing_sessions import BrowsingSessionStore
 from src.services.kufar_parser import KufarParser
+from src.services.repost_index import RepostIndex
 from src.services.location_manager import LocationManager
+from src.services.photo_resolver import PhotoResolver
 
 
 @dataclass
@@ -12,22 +18,38 @@ class AppContext:
     location_manager: LocationManager
     parser: KufarParser
     search_config: SearchConfig = field(default_factory=SearchConfig)
-    browsing_sessions: dict[int, dict[str, Any]] = field(default_factory=dict)
+    browsing_sessions: BrowsingSessionStore = field(default_factory=BrowsingSessionStore)
     targets: dict[int, SearchTarget] = field(default_factory=dict)
     seen_ads_by_target: dict[int, set[int]] = field(default_factory=dict)
     ad_photos_cache: dict[Any, list[str]] = field(default_factory=dict)
+    ad_states: AdStateStore = field(default_factory=AdStateStore)
+    repost_index: RepostIndex = field(default_factory=RepostIndex)
+    search_index: AdSearchIndex = field(default_factory=AdSearchIndex)
+    photo_resolver: PhotoResolver = field(init=False)
     _next_target_id: int = 1
+    _target_locks: dict[int, asyncio.Lock] = field(default_factory=dict, init=False, repr=False)
 
-    def add_target(self, name: str, category_id: int, extra_params: dict[str, str] | None = None) -> SearchTarget:
+    def __post_init__(self) -> None:
+        self.photo_resolver = PhotoResolver(self.parser.transport)
+
+    def add_target(
+        self,
+        name: str,
+        category_id: int,
+        extra_params: dict[str, str] | None = None,
+        target_id: int | None = None,
+    ) -> SearchTarget:
+        if target_id is None or target_id in self.targets:
+            target_id = self._next_target_id
         target = SearchTarget(
-            target_id=self._next_target_id,
+            target_id=target_id,
             name=name,
             category_id=category_id,
             extra_params=extra_params or {},
         )
         self.targets[target.target_id] = target
         self.seen_ads_by_target[target.target_id] = set()
-        self._next_target_id += 1
+        self._next_target_id = max(self._next_target_id, target_id + 1)
         return target
 
     def remove_target(self, target_id: int) -> bool:
@@ -35,8 +57,35 @@ class AppContext:
             return False
         self.targets.pop(target_id, None)
         self.seen_ads_by_target.pop(target_id, None)
+        self._target_locks.pop(target_id, None)
+        prefix = f"track_{target_id}_"
+        for key in [key for key in self.ad_photos_cache if isinstance(key, str) and key.startswith(prefix)]:
+            self.ad_photos_cache.pop(key, None)
+        self.browsing_sessions.drop_target(target_id)
+        return True
+
+    def evict_photo_cache(self, count: int) -> int:
+        evicted = list(self.ad_photos_cache)[:count]
+        for key in evicted:
+            self.ad_photos_cache.pop(key, None)
+        return len(evicted)
+
+    def target_lock(self, target_id: int) -> asyncio.Lock:
+        lock = self._target_locks.get(target_id)
+        if lock is None:
+            lock = self._target_locks[target_id] = asyncio.Lock()
+        return lock
+
+    def replace_seen(self, target_id: int, ad_ids: set[int]) -> bool:
+        # Новый set подменяется целиком: тот, кто держит ссылку на старый, не увидит полупустого состояния.
+        if target_id not in self.targets:
+            return False
+        self.seen_ads_by_target[target_id] = ad_ids
         return True
 
+    def search_config_snapshot(self) -> SearchConfig:
+        return replace(self.search_config)
+
     def toggle_target(self, target_id: int) -> SearchTarget | None:
         target = self.targets.get(target_id)
         if not target:
@@ -18,6 +18,15 @@ class AppConfig:
     targets_file: str
     kufar_auth_token: str | None
     user_agent: str
+    repost_window: int
+    stall_timeout: int
+    archive_dir: str | None
+    capture_file: str | None
+    search_index_file: str | None
+    telegram_api_url: str | None = None
+    log_json: bool = False
+    targets_reload_interval: float = 2.0
+    memory_budget_mb: int = 0
 
     @property
     def headers(self) -> dict[str, str]:
@@ -48,8 +57,37 @@ def load_config() -> AppConfig:
     except ValueError as error:
         raise ValueError("CHECK_INTERVAL должен быть числом.") from error
 
+    repost_window_raw = os.getenv("REPOST_WINDOW", "86400").strip()
+    try:
+        repost_window = int(repost_window_raw)
+    except ValueError as error:
+        raise ValueError("REPOST_WINDOW должен быть числом.") from error
+
     locations_file = os.getenv("LOCATIONS_FILE", "data/locations.json").strip() or "data/locations.json"
     targets_file = os.getenv("TARGETS_FILE", "data/targets.json").strip() or "data/targets.json"
+    stall_timeout_raw = os.getenv("STALL_TIMEOUT", "300").strip()
+    try:
+        stall_timeout = int(stall_timeout_raw)
+    except ValueError as error:
+        raise ValueError("STALL_TIMEOUT должен быть числом.") from error
+
+    archive_dir = os.getenv("ARCHIVE_DIR", "").strip() or None
+    search_index_file = os.getenv("SEARCH_INDEX_FILE", "").strip() or None
+    capture_file = os.getenv("KUFAR_CAPTURE_FILE", "").strip() or None
+    telegram_api_url = os.getenv("TELEGRAM_API_URL", "").strip().rstrip("/") or None
+    log_format = os.getenv("LOG_FORMAT", "text").strip().lower() or "text"
+    if log_format not in {"text", "json"}:
+        raise ValueError("LOG_FORMAT должен быть text или json.")
+    targets_reload_raw = os.getenv("TARGETS_RELOAD_INTERVAL", "2").strip() or "2"
+    try:
+        targets_reload_interval = float(targets_reload_raw)
+    except ValueError as error:
+        raise ValueError("TARGETS_RELOAD_INTERVAL должен быть числом.") from error
+    memory_budget_raw = os.getenv("MEMORY_BUDGET_MB", "0").strip() or "0"
+    try:
+        memory_budget_mb = int(memory_budget_raw)
+    except ValueError as error:
+        raise ValueError("MEMORY_BUDGET_MB должен быть числом.") from error
     kufar_auth_token = os.getenv("KUFAR_AUTH_TOKEN", "").strip() or None
     user_agent = os.getenv("KUFAR_USER_AGENT", DEFAULT_USER_AGENT).strip() or DEFAULT_USER_AGENT
 
@@ -61,4 +99,13 @@ def load_config() -> AppConfig:
         targets_file=targets_file,
         kufar_auth_token=kufar_auth_token,
         user_agent=user_agent,
+        repost_window=repost_window,
+        stall_timeout=stall_timeout,
+        archive_dir=archive_dir,
+        capture_file=capture_file,
+        search_index_file=search_index_file,
+        telegram_api_url=telegram_api_url,
+        log_json=log_format == "json",
+        targets_reload_interval=targets_reload_interval,
+        memory_budget_mb=memory_budget_mb,
     )
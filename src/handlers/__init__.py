@@ -1,5 +1,6 @@
+from .admin import build_admin_router
 from .ads import build_ads_router
 from .location import build_location_router
 from .watchlist import build_watchlist_router
 
-__all__ = ["build_ads_router", "build_location_router", "build_watchlist_router"]
+__all__ = ["build_admin_router", "build_ads_router", "build_location_router", "build_watchlist_router"]
@@ -0,0 +1,178 @@
+from datetime import datetime
+from html import escape
+import os
+import time
+
+from aiogram import F, Router
+from aiogram.enums import ParseMode
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from src.app_context import AppContext
+from src.config import AppConfig
+from src.services.memory_governor import MemoryGovernor
+from src.services.monitoring import MonitoringService
+from src.services.profiler import ProfileReport, SamplingProfiler
+from src.services.supervisor import LoopLagMonitor, TaskSupervisor
+from src.services.tracing import SpanStats, Tracer, tracer
+
+MAX_PROFILE_SECONDS = 300
+HEALTH_TARGETS_SHOWN = 20
+
+
+def _shorten(text: str, limit: int = 70) -> str:
+    return text if len(text) <= limit else f"…{text[-(limit - 1):]}"
+
+
+def _stages_lines(stages: dict[str, SpanStats]) -> list[str]:
+    lines = []
+    for stage, stats in Tracer.slowest(stages, limit=8):
+        lines.append(
+            f"{stage:<20} n={stats.count:<5} Σ={stats.total:7.2f}s "
+            f"avg={stats.mean * 1000:7.1f}ms max={stats.max * 1000:7.1f}ms"
+        )
+    return lines or ["нет данных"]
+
+
+def _profile_text(context: AppContext, report: ProfileReport, stages: dict[str, SpanStats]) -> str:
+    lines = [f"Сэмплов: {report.samples} за {report.duration:.1f} с", "", "Топ функций (self / total):"]
+    for name, self_count, total_count in report.top(limit=12):
+        self_share = self_count / report.samples * 100 if report.samples else 0
+        total_share = total_count / report.samples * 100 if report.samples else 0
+        lines.append(f"{self_share:5.1f}% {total_share:5.1f}% {_shorten(name)}")
+
+    lines.extend(["", "Стадии за окно профилирования:", *_stages_lines(stages)])
+    lines.extend(["", "Категории (Σ с момента запуска):"])
+    for target_id, total in tracer.target_totals()[:5]:
+        target = context.targets.get(target_id)
+        name = target.name if target else f"#{target_id}"
+        lines.append(f"{total:8.2f}s {_shorten(name, 40)}")
+    return f"<pre>{escape(chr(10).join(lines))}</pre>"
+
+
+def _format_moment(timestamp: float | None) -> str:
+    if timestamp is None:
+        return "никогда"
+    return datetime.fromtimestamp(timestamp).strftime("%d.%m %H:%M:%S")
+
+
+def _health_text(
+    context: AppContext,
+    monitoring_service: MonitoringService,
+    lag_monitor: LoopLagMonitor,
+    supervisor: TaskSupervisor,
+) -> str:
+    heartbeat_age = time.monotonic() - monitoring_service.last_heartbeat
+    active_targets = context.get_active_targets()
+    ready_count = sum(target.target_id in monitoring_service.baseline_ready for target in active_targets)
+    lines = [
+        f"Мониторинг: перезапусков {supervisor.restarts}, пульс {heartbeat_age:.0f} с назад",
+        f"Baseline готов: {ready_count} из {len(active_targets)} активных категорий",
+        f"Последний цикл: {_format_moment(monitoring_service.last_cycle_at)}",
+        f"Задержки loop: {lag_monitor.block_count} шт., Σ {lag_monitor.blocked_total:.2f} с, "
+        f"max {lag_monitor.max_lag:.2f} с",
+        f"Telegram 429: {monitoring_service.send_retries} повторов, ожидание Σ {monitoring_service.retry_wait_total:.0f} с",
+    ]
+    if supervisor.last_restart_reason:
+        lines.append(f"Причина перезапуска: {supervisor.last_restart_reason}")
+    if lag_monitor.last_event:
+        event = lag_monitor.last_event
+        lines.append(f"Последняя: {_format_moment(event.happened_at)} {event.lag:.2f} с в {_shorten(event.culprit)}")
+
+    lines.extend(["", "Последний успешный опрос, сначала давние (! - опрос приостановлен из-за ошибок):"])
+    failing = monitoring_service.breaker.open_targets()
+    last_success_by_target = monitoring_service.last_success_by_target
+    # Сообщение Telegram ограничено 4096 символами: показываем только самые проблемные категории.
+    targets = sorted(
+        context.targets.values(),
+        key=lambda target: (
+            target.target_id not in failing,
+            not target.enabled,
+            last_success_by_target.get(target.target_id) or 0,
+        ),
+    )
+    for target in targets[:HEALTH_TARGETS_SHOWN]:
+        last_success = last_success_by_target.get(target.target_id)
+        mark = "!" if target.target_id in failing else " "
+        lines.append(f"{_format_moment(last_success):<15} {mark} {_shorten(target.name, 40)}")
+    if len(targets) > HEALTH_TARGETS_SHOWN:
+        lines.append(f"...и ещё {len(targets) - HEALTH_TARGETS_SHOWN}")
+    return f"<pre>{escape(chr(10).join(lines))}</pre>"
+
+
+def _format_bytes(size: float) -> str:
+    if size >= 2**20:
+        return f"{size / 2**20:.1f} МБ"
+    return f"{size / 1024:.0f} КБ"
+
+
+def _process_rss() -> int | None:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def _memory_text(governor: MemoryGovernor) -> str:
+    usage = sorted(governor.usage(), key=lambda item: item.size, reverse=True)
+    budget = _format_bytes(governor.budget) if governor.budget else "не задан"
+    lines = [f"Кэши: ~{_format_bytes(governor.last_total)}, бюджет: {budget}"]
+    rss = _process_rss()
+    if rss is not None:
+        lines.append(f"RSS процесса: {_format_bytes(rss)}")
+    lines.extend(["", f"{'кэш':<20} {'записей':>8} {'оценка':>9} {'приор.':>6} {'вытесн.':>8}"])
+    for item in usage:
+        priority = "-" if item.priority is None else str(item.priority)
+        lines.append(
+            f"{item.name:<20} {item.entries:>8} {_format_bytes(item.size):>9} {priority:>6} {item.evicted:>8}"
+        )
+    return f"<pre>{escape(chr(10).join(lines))}</pre>"
+
+
+def build_admin_router(
+    context: AppContext,
+    config: AppConfig,
+    profiler: SamplingProfiler,
+    monitoring_service: MonitoringService,
+    lag_monitor: LoopLagMonitor,
+    supervisor: TaskSupervisor,
+    memory_governor: MemoryGovernor,
+) -> Router:
+    router = Router(name="admin")
+    router.message.filter(F.from_user.id == config.user_id)
+
+    @router.message(Command("profile"))
+    async def cmd_profile(message: Message, command: CommandObject) -> None:
+        raw_seconds = (command.args or "30").strip()
+        if not raw_seconds.isdigit() or not 1 <= int(raw_seconds) <= MAX_PROFILE_SECONDS:
+            await message.answer(f"Использование: /profile N, где N от 1 до {MAX_PROFILE_SECONDS} секунд.")
+            return
+        if profiler.running:
+            await message.answer("⏳ Профилирование уже идёт.")
+            return
+
+        seconds = int(raw_seconds)
+        await message.answer(f"⏳ Профилирую {seconds} с...")
+        with tracer.capture() as stages:
+            report = await profiler.profile(seconds)
+        await message.answer(_profile_text(context, report, stages), parse_mode=ParseMode.HTML)
+
+    @router.message(Command("stages"))
+    async def cmd_stages(message: Message) -> None:
+        text = "\n".join(_stages_lines(tracer.stages))
+        await message.answer(f"<pre>{escape(text)}</pre>", parse_mode=ParseMode.HTML)
+
+    @router.message(Command("health"))
+    async def cmd_health(message: Message) -> None:
+        await message.answer(
+            _health_text(context, monitoring_service, lag_monitor, supervisor),
+            parse_mode=ParseMode.HTML,
+        )
+
+    @router.message(Command("memory"))
+    async def cmd_memory(message: Message) -> None:
+        await message.answer(_memory_text(memory_governor), parse_mode=ParseMode.HTML)
+
+    return router
@@ -1,15 +1,45 @@
+import asyncio
+import logging
+import re
+
 from aiogram import Bot, F, Router
 from aiogram.enums import ParseMode
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import CallbackQuery, InputMediaPhoto, Message
 from html import escape
 
 from src.app_context import AppContext
 from src.models.search_target import SearchTarget
+from src.services.browsing_sessions import BrowsingSession
 from src.keyboards.ads import get_target_picker_keyboard, get_view_keyboard
 from src.keyboards.watchlist import get_dashboard_keyboard
 
 
+PRICE_RANGE_RE = re.compile(r"(?<!\w)(\d+)\s*-\s*(\d+)(?!\w)")
+PRICE_BOUND_RE = re.compile(r"(?<!\w)(от|до)\s*(\d+)(?!\w)", re.IGNORECASE)
+# Токен next у Kufar хранит номер страницы, а не смещение, поэтому размер страницы
+# должен быть одинаковым по всей цепочке курсоров, иначе часть объявлений пропадёт.
+PAGE_SIZE = 20
+PREFETCH_DISTANCE = 3
+
+
+def _parse_find_query(text: str) -> tuple[str, int | None, int | None]:
+    min_price = max_price = None
+    range_match = PRICE_RANGE_RE.search(text)
+    if range_match:
+        min_price, max_price = int(range_match.group(1)) * 100, int(range_match.group(2)) * 100
+        text = PRICE_RANGE_RE.sub(" ", text, count=1)
+
+    for bound, value in PRICE_BOUND_RE.findall(text):
+        if bound.lower() == "от":
+            min_price = int(value) * 100
+        else:
+            max_price = int(value) * 100
+    text = PRICE_BOUND_RE.sub(" ", text)
+    text = text.replace("р.", " ")
+    return " ".join(text.split()), min_price, max_price
+
+
 def _get_enabled_targets(context: AppContext) -> list[SearchTarget]:
     return [target for target in context.targets.values() if target.enabled]
 
@@ -93,8 +123,8 @@ async def _open_target_ads(
     if message_to_edit:
         await message_to_edit.edit_text(f"⏳ Загружаю категорию: {escape(target.name)}...")
 
-    ads = await context.parser.fetch_search_results(context.search_config, target)
-    if not ads:
+    page = await context.parser.fetch_search_page(context.search_config_snapshot(), target, size=PAGE_SIZE)
+    if not page.ads:
         text = f"❌ В категории <b>{escape(target.name)}</b> объявлений нет."
         if message_to_edit:
             await message_to_edit.edit_text(text, parse_mode=ParseMode.HTML)
@@ -102,7 +132,13 @@ async def _open_target_ads(
             await bot.send_message(chat_id, text, parse_mode=ParseMode.HTML)
         return
 
-    context.browsing_sessions[user_id] = {"ads": ads, "index": 0, "target_id": target.target_id}
+    context.browsing_sessions.open(
+        user_id,
+        page.ads,
+        target_id=target.target_id,
+        next_cursor=page.next_cursor,
+        total=page.total,
+    )
     await _update_ad_view(
         bot=bot,
         context=context,
@@ -112,6 +148,38 @@ async def _open_target_ads(
     )
 
 
+async def _load_next_page(context: AppContext, session: BrowsingSession) -> None:
+    target = context.targets.get(session.target_id)
+    cursor = session.next_cursor
+    if not target or not cursor:
+        session.next_cursor = None
+        return
+
+    page = await context.parser.fetch_search_page(
+        context.search_config_snapshot(),
+        target,
+        cursor=cursor,
+        size=PAGE_SIZE,
+    )
+    if session.next_cursor != cursor:
+        return
+    if not page.ads:
+        logging.info("Следующая страница '%s' не загрузилась, повтор при следующем переходе.", target.name)
+        return
+    session.extend(page.ads)
+    session.next_cursor = page.next_cursor
+    if page.total:
+        session.total = page.total
+
+
+def _prefetch_next_page(context: AppContext, session: BrowsingSession) -> asyncio.Task | None:
+    if not session.next_cursor:
+        return None
+    if session.loading is None or session.loading.done():
+        session.loading = asyncio.create_task(_load_next_page(context, session))
+    return session.loading
+
+
 async def _update_ad_view(
     bot: Bot,
     context: AppContext,
@@ -124,23 +192,26 @@ async def _update_ad_view(
     if not session:
         return
 
-    ads = session["ads"]
-    index = session["index"]
-    current_ad = ads[index]
-    link = current_ad.get("ad_link", "https://www.kufar.by/")
-    target_id = session.get("target_id")
-    target = context.targets.get(target_id)
+    index = session.index
+    total = session.total_label
+    ref = session.current
+    link = ref.link or "https://www.kufar.by/"
+    target = context.targets.get(session.target_id)
 
-    details = await context.parser.fetch_ad_details(link)
-    ad_data = details if details else current_ad
+    details = await context.parser.fetch_ad_details(ref.link) if session.fetch_details and ref.link else None
+    ad_data = details or context.search_index.get(ref.ad_id) or ref.to_ad()
 
-    text = context.parser.format_caption(ad_data, index, len(ads))
+    text = context.parser.format_caption(ad_data, index, total)
     if target:
         text = f"🏷 <b>{escape(target.name)}</b>\n{text}"
-    photos = context.parser.get_all_photos(ad_data)
-    context.ad_photos_cache[f"view_{user_id}"] = photos
-
-    keyboard = get_view_keyboard(link, index, len(ads), len(photos) > 1)
+    elif session.title:
+        text = f"{escape(session.title)}\n{text}"
+    photos = await context.photo_resolver.resolve(context.parser.get_all_photos(ad_data))
+    session.photos = photos
+    if len(session.ads) - index <= PREFETCH_DISTANCE:
+        _prefetch_next_page(context, session)
+
+    keyboard = get_view_keyboard(link, index, total, len(photos) > 1)
     media = InputMediaPhoto(media=photos[0], caption=text, parse_mode=ParseMode.HTML)
 
     try:
@@ -186,6 +257,33 @@ def build_ads_router(context: AppContext, bot: Bot) -> Router:
         wait_message = await message.answer("⏳ Проверяю категории...")
         await _start_all_flow(bot, context, message.chat.id, message.from_user.id, message_to_edit=wait_message)
 
+    @router.message(Command("find"))
+    async def cmd_find(message: Message, command: CommandObject) -> None:
+        query, min_price, max_price = _parse_find_query(command.args or "")
+        if not query and min_price is None and max_price is None:
+            await message.answer(
+                (
+                    "🔎 Поиск по уже увиденным объявлениям.\n\n"
+                    "Пример: <code>/find iphone 13 до 1500</code> или <code>/find pixel 500-900</code>"
+                ),
+                parse_mode=ParseMode.HTML,
+            )
+            return
+
+        ads = context.search_index.search(query, min_price=min_price, max_price=max_price)
+        if not ads:
+            await message.answer(f"🔎 Ничего не найдено среди {len(context.search_index)} объявлений.")
+            return
+
+        context.browsing_sessions.open(
+            message.from_user.id,
+            ads,
+            title=f"🔎 {query or 'Поиск'}",
+            fetch_details=False,
+        )
+        wait_message = await message.answer(f"🔎 Найдено: {len(ads)}")
+        await _update_ad_view(bot, context, message.chat.id, message.from_user.id, message_to_edit=wait_message)
+
     @router.callback_query(F.data == "menu_all")
     async def menu_all(callback: CallbackQuery) -> None:
         await _start_all_flow(bot, context, callback.message.chat.id, callback.from_user.id)
@@ -219,36 +317,36 @@ def build_ads_router(context: AppContext, bot: Bot) -> Router:
         user_id = callback.from_user.id
         action = callback.data.split("_")[1]
 
-        if user_id not in context.browsing_sessions:
+        session = context.browsing_sessions.get(user_id)
+        if not session:
             await callback.answer("Сессия истекла")
             return
 
-        session = context.browsing_sessions[user_id]
-        total = len(session["ads"])
-
         if action == "next":
-            session["index"] = (session["index"] + 1) % total
+            if session.index + 1 >= len(session.ads):
+                loading = _prefetch_next_page(context, session)
+                if loading:
+                    await loading
+            session.index = (session.index + 1) % len(session.ads)
             await _update_ad_view(bot, context, callback.message.chat.id, user_id, message_id=callback.message.message_id)
             await callback.answer()
             return
 
         if action == "prev":
-            session["index"] = (session["index"] - 1 + total) % total
+            session.index = (session.index - 1) % len(session.ads)
             await _update_ad_view(bot, context, callback.message.chat.id, user_id, message_id=callback.message.message_id)
             await callback.answer()
             return
 
         if action == "photos":
-            photos = context.ad_photos_cache.get(f"view_{user_id}", [])
-            if photos:
-                media = [InputMediaPhoto(media=url) for url in photos[:10]]
+            if session.photos:
+                media = [InputMediaPhoto(media=url) for url in session.photos[:10]]
                 await bot.send_media_group(callback.message.chat.id, media=media)
             await callback.answer()
             return
 
         if action == "close":
-            context.browsing_sessions.pop(user_id, None)
-            context.ad_photos_cache.pop(f"view_{user_id}", None)
+            context.browsing_sessions.pop(user_id)
             await callback.message.delete()
             await callback.answer()
             return
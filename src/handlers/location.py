@@ -1,3 +1,5 @@
+from html import escape
+
 from aiogram import F, Router
 from aiogram.enums import ParseMode
 from aiogram.filters import Command, StateFilter
@@ -5,9 +7,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from src.app_context import AppContext
+from src.keyboards.watchlist import get_target_locations_keyboard
+from src.models.search_location import SearchLocation
 from src.services.monitoring import MonitoringService
+from src.services.target_storage import TargetStorage
 from src.states.location import LocationStates
 
+MAX_TARGET_LOCATIONS = 5
+
 
 def _regions_keyboard(context: AppContext) -> InlineKeyboardMarkup:
     rows = []
@@ -28,19 +35,58 @@ def _areas_keyboard(context: AppContext, region_id: int, region_name: str) -> In
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def build_location_router(context: AppContext, monitoring_service: MonitoringService) -> Router:
+def build_location_router(
+    context: AppContext,
+    monitoring_service: MonitoringService,
+    target_storage: TargetStorage,
+) -> Router:
     router = Router(name="location")
 
     async def _open_location_menu(message: Message, state: FSMContext) -> None:
+        await state.clear()
         await message.answer("🌍 Выберите регион поиска:", reply_markup=_regions_keyboard(context))
         await state.set_state(LocationStates.waiting_for_region)
 
+    async def _apply_target_location(
+        callback: CallbackQuery,
+        state: FSMContext,
+        target_id: int,
+        location: SearchLocation,
+    ) -> None:
+        await state.clear()
+        target = context.targets.get(target_id)
+        if not target:
+            await callback.answer("Категория не найдена", show_alert=True)
+            return
+        if location in target.locations:
+            await callback.answer("Эта локация уже добавлена", show_alert=True)
+            return
+        if len(target.locations) >= MAX_TARGET_LOCATIONS:
+            await callback.answer(f"Не больше {MAX_TARGET_LOCATIONS} локаций на категорию", show_alert=True)
+            return
+
+        target.locations.append(location)
+        target_storage.schedule_save(context)
+        await callback.message.edit_text("⏳ Применяю локацию категории...")
+        total = await monitoring_service.update_target_baseline(target)
+        await callback.message.edit_text(
+            (
+                f"✅ Локация добавлена для <b>{escape(target.name)}</b>:\n"
+                f"<b>{escape(target.location_label(context.search_config.location_label))}</b>\n\n"
+                f"Старые объявления пропущены ({total})."
+            ),
+            parse_mode=ParseMode.HTML,
+            reply_markup=get_target_locations_keyboard(target),
+        )
+        await callback.answer()
+
     @router.message(Command("set_location"))
     async def cmd_set_location(message: Message, state: FSMContext) -> None:
         await _open_location_menu(message, state)
 
     @router.callback_query(F.data == "menu_set_location")
     async def menu_set_location(callback: CallbackQuery, state: FSMContext) -> None:
+        await state.clear()
         await callback.message.answer("🌍 Выберите регион поиска:", reply_markup=_regions_keyboard(context))
         await state.set_state(LocationStates.waiting_for_region)
         await callback.answer()
@@ -48,12 +94,17 @@ def build_location_router(context: AppContext, monitoring_service: MonitoringSer
     @router.callback_query(StateFilter(LocationStates.waiting_for_region), F.data.startswith("setrgn_"))
     async def process_region_choice(callback: CallbackQuery, state: FSMContext) -> None:
         region_id = int(callback.data.split("_")[1])
+        target_id = (await state.get_data()).get("target_id")
+
+        if region_id == 0 and target_id:
+            await _apply_target_location(callback, state, target_id, SearchLocation())
+            return
 
         if region_id == 0:
             context.search_config.set_countrywide()
             await state.clear()
             await callback.message.edit_text("⏳ Обновляю настройки (Вся Беларусь)...")
-            total = await monitoring_service.update_all_baselines()
+            total = await monitoring_service.update_global_location_baselines()
             await callback.message.edit_text(
                 (
                     "✅ Регион: <b>Вся Беларусь</b>.\n"
@@ -86,6 +137,16 @@ def build_location_router(context: AppContext, monitoring_service: MonitoringSer
             return
 
         region_name = context.location_manager.regions.get(region_id, "")
+        target_id = data.get("target_id")
+        if target_id:
+            if area_id == 0:
+                location = SearchLocation(rgn=region_id, label=f"{region_name} (Весь регион)")
+            else:
+                area_name = context.location_manager.areas[region_id].get(area_id, "")
+                location = SearchLocation(rgn=region_id, ar=area_id, label=f"{region_name}, {area_name}")
+            await _apply_target_location(callback, state, target_id, location)
+            return
+
         context.search_config.set_region(region_id, region_name)
 
         if area_id == 0:
@@ -96,7 +157,7 @@ def build_location_router(context: AppContext, monitoring_service: MonitoringSer
 
         await state.clear()
         await callback.message.edit_text("⏳ Применяю настройки локации...")
-        total = await monitoring_service.update_all_baselines()
+        total = await monitoring_service.update_global_location_baselines()
         await callback.message.edit_text(
             (
                 "✅ Настройки обновлены:\n"
@@ -107,6 +168,24 @@ def build_location_router(context: AppContext, monitoring_service: MonitoringSer
         )
         await callback.answer()
 
+    @router.callback_query(F.data.startswith("target_locadd_"))
+    async def target_location_add(callback: CallbackQuery, state: FSMContext) -> None:
+        target_id = int(callback.data.split("_")[2])
+        target = context.targets.get(target_id)
+        if not target:
+            await callback.answer("Категория не найдена", show_alert=True)
+            return
+
+        await state.clear()
+        await state.update_data(target_id=target_id)
+        await callback.message.edit_text(
+            f"🌍 Регион для категории <b>{escape(target.name)}</b>:",
+            reply_markup=_regions_keyboard(context),
+            parse_mode=ParseMode.HTML,
+        )
+        await state.set_state(LocationStates.waiting_for_region)
+        await callback.answer()
+
     @router.callback_query(F.data == "back_to_regions")
     async def back_to_regions(callback: CallbackQuery, state: FSMContext) -> None:
         await callback.message.edit_text("🌍 Выберите регион поиска:", reply_markup=_regions_keyboard(context))
@@ -1,21 +1,29 @@
+import asyncio
+from datetime import datetime
+import math
 import re
 from html import escape
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qs, urlencode, urlparse
 
 from aiogram import F, Router
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import BufferedInputFile, CallbackQuery, Message
 
 from src.app_context import AppContext
 from src.keyboards.watchlist import (
     get_add_target_keyboard,
     get_dashboard_keyboard,
+    get_target_locations_keyboard,
     get_target_manage_keyboard,
     get_targets_list_keyboard,
 )
+from src.models.search_target import SearchTarget
+from src.services.circuit_breaker import HALF_OPEN, OPEN, TargetHealth
+from src.services.kufar_parser import SearchError
 from src.services.monitoring import MonitoringService
 from src.services.target_storage import TargetStorage
+from src.services.tracing import tracer
 from src.states.target import TargetStates
 
 
@@ -42,6 +50,42 @@ def _targets_text(context: AppContext) -> str:
     return "\n".join(lines)
 
 
+def _target_health_text(health: TargetHealth) -> str:
+    if health.state == OPEN:
+        text = f"Опрос: <b>🔴 не отвечает</b>, повтор через {math.ceil(health.retry_in / 60)} мин"
+    elif health.state == HALF_OPEN:
+        text = "Опрос: <b>🟡 пробный запрос</b>"
+    else:
+        text = "Опрос: <b>🟢 в порядке</b>"
+    if health.last_error and health.last_error_at:
+        moment = datetime.fromtimestamp(health.last_error_at).strftime("%d.%m %H:%M")
+        text += f"\nПоследняя ошибка ({moment}): <code>{escape(health.last_error)}</code>"
+    return text
+
+
+def _target_card_text(context: AppContext, monitoring_service: MonitoringService, target: SearchTarget) -> str:
+    location = target.location_label(context.search_config.location_label)
+    return (
+        f"🎯 <b>{escape(target.name)}</b>\n\n"
+        f"Статус: <b>{'Активна' if target.enabled else 'На паузе'}</b>\n"
+        f"Параметры: <code>{escape(target.debug_label)}</code>\n"
+        f"Локация: <b>{escape(location)}</b>\n"
+        f"{_target_health_text(monitoring_service.breaker.health(target.target_id))}"
+    )
+
+
+def _target_locations_text(context: AppContext, target: SearchTarget) -> str:
+    if not target.locations:
+        return (
+            f"📍 <b>{escape(target.name)}</b>\n\n"
+            f"Используется общая локация: <b>{escape(context.search_config.location_label)}</b>.\n"
+            "Добавь одну или несколько локаций, чтобы искать только в них."
+        )
+    lines = [f"📍 <b>{escape(target.name)}</b>", ""]
+    lines.extend(f"• {escape(location.label)}" for location in target.locations)
+    return "\n".join(lines)
+
+
 def _parse_target_source(text: str) -> tuple[int, dict[str, str], str]:
     payload = text.strip()
     if not payload:
@@ -91,6 +135,54 @@ def _parse_target_source(text: str) -> tuple[int, dict[str, str], str]:
     raise ValueError("Нужен ID категории (например 17010) или полная ссылка Kufar.")
 
 
+IMPORT_PROBE_CONCURRENCY = 8
+MAX_IMPORT_LINES = 500
+MAX_IMPORT_FILE_SIZE = 512 * 1024
+EXPORT_BASE_URL = "https://www.kufar.by/l"
+
+
+def _parse_import_line(line: str) -> tuple[str, int, dict[str, str]]:
+    name, _, source = line.rpartition("|")
+    category_id, extra_params, auto_name = _parse_target_source(source)
+    return (name.strip()[:60] or auto_name), category_id, extra_params
+
+
+def _export_line(target: SearchTarget) -> str:
+    if target.extra_params:
+        source = f"{EXPORT_BASE_URL}?{urlencode({'cat': target.category_id, **target.extra_params})}"
+    else:
+        source = f"cat={target.category_id}"
+    return f"{target.name.replace('|', '/')} | {source}"
+
+
+def _export_text(context: AppContext) -> str:
+    lines = [
+        "# Категории Kufar: по одной на строку, формат «Имя | ссылка или cat=ID».",
+        "# Загрузить обратно: /import с этим файлом. Локации категорий и пауза не переносятся.",
+    ]
+    lines.extend(_export_line(target) for target in context.targets.values())
+    return "\n".join(lines) + "\n"
+
+
+def _target_key(category_id: int, extra_params: dict[str, str]) -> tuple:
+    return category_id, tuple(sorted(extra_params.items()))
+
+
+async def _probe_targets(context: AppContext, targets: list[SearchTarget]) -> list[str | None]:
+    config = context.search_config_snapshot()
+    semaphore = asyncio.Semaphore(IMPORT_PROBE_CONCURRENCY)
+
+    async def probe(target: SearchTarget) -> str | None:
+        async with semaphore:
+            try:
+                await context.parser.probe(config, target)
+            except SearchError as error:
+                return str(error)
+        return None
+
+    return await asyncio.gather(*(probe(target) for target in targets))
+
+
 def build_watchlist_router(
     context: AppContext,
     monitoring_service: MonitoringService,
@@ -99,17 +191,136 @@ def build_watchlist_router(
     router = Router(name="watchlist")
 
     @router.message(Command("menu"))
-    async def cmd_menu(message: Message) -> None:
+    async def cmd_menu(message: Message, state: FSMContext) -> None:
+        await state.clear()
         await message.answer(_dashboard_text(context), reply_markup=get_dashboard_keyboard(), parse_mode="HTML")
 
     @router.message(Command("targets"))
     async def cmd_targets(message: Message) -> None:
         await message.answer(
             _targets_text(context),
-            reply_markup=get_targets_list_keyboard(list(context.targets.values())),
+            reply_markup=get_targets_list_keyboard(
+                list(context.targets.values()),
+                monitoring_service.breaker.open_targets(),
+            ),
             parse_mode="HTML",
         )
 
+    async def _import_targets(message: Message, text: str) -> None:
+        lines = [line.strip() for line in text.splitlines()]
+        lines = [line for line in lines if line and not line.startswith("#")]
+        if not lines:
+            await message.answer(
+                "Список пуст: нужны строки вида <code>Имя | ссылка</code> или <code>cat=ID</code>.",
+                parse_mode="HTML",
+            )
+            return
+        if len(lines) > MAX_IMPORT_LINES:
+            await message.answer(f"Слишком много строк: {len(lines)}, максимум {MAX_IMPORT_LINES}.")
+            return
+
+        known = {_target_key(target.category_id, target.extra_params) for target in context.targets.values()}
+        candidates: list[SearchTarget] = []
+        errors: list[str] = []
+        duplicates = 0
+        for number, line in enumerate(lines, start=1):
+            try:
+                name, category_id, extra_params = _parse_import_line(line)
+            except ValueError as error:
+                errors.append(f"{number}: {escape(str(error))}")
+                continue
+            key = _target_key(category_id, extra_params)
+            if key in known:
+                duplicates += 1
+                continue
+            known.add(key)
+            candidates.append(SearchTarget(target_id=0, name=name, category_id=category_id, extra_params=extra_params))
+
+        progress = await message.answer(f"⏳ Проверяю {len(candidates)} категорий...")
+        probe_errors = await _probe_targets(context, candidates)
+        added: list[SearchTarget] = []
+        for candidate, error in zip(candidates, probe_errors):
+            if error:
+                errors.append(f"{escape(candidate.name)}: {escape(error)}")
+                continue
+            added.append(
+                context.add_target(
+                    name=candidate.name,
+                    category_id=candidate.category_id,
+                    extra_params=candidate.extra_params,
+                )
+            )
+
+        if added:
+            target_storage.schedule_save(context)
+            await progress.edit_text(f"⏳ Добавлено {len(added)}, собираю baseline...")
+            total = await monitoring_service.update_targets_baseline(added)
+        else:
+            total = 0
+
+        lines = [
+            f"📥 Импорт: добавлено <b>{len(added)}</b>, уже были: {duplicates}, с ошибками: {len(errors)}.",
+        ]
+        if added:
+            lines.append(f"Baseline: {total} объявлений.")
+        if errors:
+            lines.append("")
+            lines.extend(f"• {error}" for error in errors[:20])
+            if len(errors) > 20:
+                lines.append(f"• ...и ещё {len(errors) - 20}")
+        await progress.edit_text("\n".join(lines), parse_mode="HTML")
+
+    @router.message(Command("import"), F.document)
+    @router.message(StateFilter(TargetStates.waiting_for_import), F.document)
+    async def cmd_import_document(message: Message, state: FSMContext) -> None:
+        await state.clear()
+        document = message.document
+        if document.file_size and document.file_size > MAX_IMPORT_FILE_SIZE:
+            await message.answer(f"Файл больше {MAX_IMPORT_FILE_SIZE // 1024} КБ.")
+            return
+        buffer = await message.bot.download(document)
+        try:
+            text = buffer.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            await message.answer("Файл должен быть текстовым в UTF-8.")
+            return
+        await _import_targets(message, text)
+
+    @router.message(Command("import"))
+    async def cmd_import(message: Message, command: CommandObject, state: FSMContext) -> None:
+        if command.args:
+            await state.clear()
+            await _import_targets(message, command.args)
+            return
+        await state.set_state(TargetStates.waiting_for_import)
+        await message.answer(
+            (
+                "📥 <b>Массовое добавление категорий</b>\n\n"
+                "Пришли текстом или .txt файлом список, по одной категории на строку:\n"
+                "<code>Имя | https://www.kufar.by/l?cat=17010&amp;query=iphone</code>\n"
+                "<code>cat=16040</code>\n\n"
+                "Строки с <code>#</code> пропускаются. Для отмены - кнопка ниже или /menu."
+            ),
+            parse_mode="HTML",
+            reply_markup=get_add_target_keyboard(),
+        )
+
+    @router.message(StateFilter(TargetStates.waiting_for_import), F.text, ~F.text.startswith("/"))
+    async def import_text_input(message: Message, state: FSMContext) -> None:
+        await state.clear()
+        await _import_targets(message, message.text or "")
+
+    @router.message(Command("export"))
+    async def cmd_export(message: Message) -> None:
+        if not context.targets:
+            await message.answer("Категорий пока нет.")
+            return
+        stamp = datetime.now().strftime("%Y%m%d-%H%M")
+        await message.answer_document(
+            BufferedInputFile(_export_text(context).encode("utf-8"), filename=f"kufar-targets-{stamp}.txt"),
+            caption=f"📤 Категорий: {len(context.targets)}. Загрузить обратно: /import с этим файлом.",
+        )
+
     @router.callback_query(F.data == "menu_open")
     async def menu_open(callback: CallbackQuery) -> None:
         await callback.message.edit_text(
@@ -123,7 +334,10 @@ def build_watchlist_router(
     async def menu_targets(callback: CallbackQuery) -> None:
         await callback.message.edit_text(
             _targets_text(context),
-            reply_markup=get_targets_list_keyboard(list(context.targets.values())),
+            reply_markup=get_targets_list_keyboard(
+                list(context.targets.values()),
+                monitoring_service.breaker.open_targets(),
+            ),
             parse_mode="HTML",
         )
         await callback.answer()
@@ -218,7 +432,7 @@ def build_watchlist_router(
         name = auto_name if raw_name in {"", "-"} else raw_name[:60]
 
         target = context.add_target(name=name, category_id=int(category_id), extra_params=extra_params)
-        target_storage.save(context)
+        target_storage.schedule_save(context)
         await monitoring_service.update_target_baseline(target)
         await state.clear()
 
@@ -243,14 +457,11 @@ def build_watchlist_router(
             await callback.answer("Категория не найдена", show_alert=True)
             return
 
-        status = "Активна" if target.enabled else "На паузе"
-        text = (
-            f"🎯 <b>{escape(target.name)}</b>\n\n"
-            f"Статус: <b>{status}</b>\n"
-            f"Параметры: <code>{escape(target.debug_label)}</code>\n"
-            f"Локация: <b>{escape(context.search_config.location_label)}</b>"
+        await callback.message.edit_text(
+            _target_card_text(context, monitoring_service, target),
+            parse_mode="HTML",
+            reply_markup=get_target_manage_keyboard(target),
         )
-        await callback.message.edit_text(text, parse_mode="HTML", reply_markup=get_target_manage_keyboard(target))
         await callback.answer()
 
     @router.callback_query(F.data.startswith("target_toggle_"))
@@ -261,20 +472,18 @@ def build_watchlist_router(
             await callback.answer("Категория не найдена", show_alert=True)
             return
 
-        target_storage.save(context)
+        target_storage.schedule_save(context)
         if target.enabled:
             await monitoring_service.update_target_baseline(target)
 
         status = "включена" if target.enabled else "поставлена на паузу"
         await callback.answer(f"Категория {status}")
 
-        text = (
-            f"🎯 <b>{escape(target.name)}</b>\n\n"
-            f"Статус: <b>{'Активна' if target.enabled else 'На паузе'}</b>\n"
-            f"Параметры: <code>{escape(target.debug_label)}</code>\n"
-            f"Локация: <b>{escape(context.search_config.location_label)}</b>"
+        await callback.message.edit_text(
+            _target_card_text(context, monitoring_service, target),
+            parse_mode="HTML",
+            reply_markup=get_target_manage_keyboard(target),
         )
-        await callback.message.edit_text(text, parse_mode="HTML", reply_markup=get_target_manage_keyboard(target))
 
     @router.callback_query(F.data.startswith("target_remove_"))
     async def target_remove(callback: CallbackQuery) -> None:
@@ -285,23 +494,17 @@ def build_watchlist_router(
             return
 
         context.remove_target(target_id)
-        target_storage.save(context)
-        to_delete = [
-            key
-            for key in context.ad_photos_cache
-            if isinstance(key, str) and key.startswith(f"track_{target_id}_")
-        ]
-        for key in to_delete:
-            context.ad_photos_cache.pop(key, None)
-
-        for user_id, session in list(context.browsing_sessions.items()):
-            if session.get("target_id") == target_id:
-                context.browsing_sessions.pop(user_id, None)
+        tracer.forget_target(target_id)
+        monitoring_service.forget_target(target_id)
+        target_storage.schedule_save(context)
 
         await callback.message.edit_text(
             f"🗑 Категория удалена: <b>{escape(target.name)}</b>",
             parse_mode="HTML",
-            reply_markup=get_targets_list_keyboard(list(context.targets.values())),
+            reply_markup=get_targets_list_keyboard(
+                list(context.targets.values()),
+                monitoring_service.breaker.open_targets(),
+            ),
         )
         await callback.answer()
 
@@ -316,17 +519,44 @@ def build_watchlist_router(
         count = await monitoring_service.update_target_baseline(target)
         await callback.answer(f"Baseline обновлен ({count})")
         await callback.message.edit_text(
-            (
-                f"🎯 <b>{escape(target.name)}</b>\n\n"
-                f"Статус: <b>{'Активна' if target.enabled else 'На паузе'}</b>\n"
-                f"Параметры: <code>{escape(target.debug_label)}</code>\n"
-                f"Локация: <b>{escape(context.search_config.location_label)}</b>\n\n"
-                f"Baseline: {count} объявлений."
-            ),
+            f"{_target_card_text(context, monitoring_service, target)}\n\nBaseline: {count} объявлений.",
             parse_mode="HTML",
             reply_markup=get_target_manage_keyboard(target),
         )
 
+    @router.callback_query(F.data.startswith("target_locations_"))
+    async def target_locations(callback: CallbackQuery) -> None:
+        target_id = int(callback.data.split("_")[2])
+        target = context.targets.get(target_id)
+        if not target:
+            await callback.answer("Категория не найдена", show_alert=True)
+            return
+
+        await callback.message.edit_text(
+            _target_locations_text(context, target),
+            parse_mode="HTML",
+            reply_markup=get_target_locations_keyboard(target),
+        )
+        await callback.answer()
+
+    @router.callback_query(F.data.startswith("target_locclear_"))
+    async def target_locations_clear(callback: CallbackQuery) -> None:
+        target_id = int(callback.data.split("_")[2])
+        target = context.targets.get(target_id)
+        if not target:
+            await callback.answer("Категория не найдена", show_alert=True)
+            return
+
+        target.locations.clear()
+        target_storage.schedule_save(context)
+        count = await monitoring_service.update_target_baseline(target)
+        await callback.answer(f"Локации сброшены, baseline: {count}")
+        await callback.message.edit_text(
+            _target_locations_text(context, target),
+            parse_mode="HTML",
+            reply_markup=get_target_locations_keyboard(target),
+        )
+
     @router.callback_query(F.data == "menu_rebaseline")
     async def menu_rebaseline(callback: CallbackQuery) -> None:
         total = await monitoring_service.update_all_baselines()
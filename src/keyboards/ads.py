@@ -2,7 +2,7 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from src.models.search_target import SearchTarget
 
-def get_view_keyboard(url: str, current_idx: int, total: int, has_photos: bool) -> InlineKeyboardMarkup:
+def get_view_keyboard(url: str, current_idx: int, total: int | str, has_photos: bool) -> InlineKeyboardMarkup:
     rows = [
         [
             InlineKeyboardButton(text="⬅️", callback_data="nav_prev"),
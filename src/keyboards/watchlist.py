@@ -18,10 +18,11 @@ def get_dashboard_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def get_targets_list_keyboard(targets: list[SearchTarget]) -> InlineKeyboardMarkup:
+def get_targets_list_keyboard(targets: list[SearchTarget], failing: set[int] | None = None) -> InlineKeyboardMarkup:
     rows = []
     for target in targets:
-        rows.append([InlineKeyboardButton(text=target.short_label, callback_data=f"target_open_{target.target_id}")])
+        label = f"🔴 {target.name}" if failing and target.target_id in failing else target.short_label
+        rows.append([InlineKeyboardButton(text=label, callback_data=f"target_open_{target.target_id}")])
     rows.append(
         [
             InlineKeyboardButton(text="➕ Добавить", callback_data="menu_add_target"),
@@ -38,12 +39,25 @@ def get_target_manage_keyboard(target: SearchTarget) -> InlineKeyboardMarkup:
             InlineKeyboardButton(text=toggle_label, callback_data=f"target_toggle_{target.target_id}"),
             InlineKeyboardButton(text="🗑 Удалить", callback_data=f"target_remove_{target.target_id}"),
         ],
-        [InlineKeyboardButton(text="🔄 Rebaseline", callback_data=f"target_baseline_{target.target_id}")],
+        [
+            InlineKeyboardButton(text="🔄 Rebaseline", callback_data=f"target_baseline_{target.target_id}"),
+            InlineKeyboardButton(text="📍 Локации", callback_data=f"target_locations_{target.target_id}"),
+        ],
         [InlineKeyboardButton(text="⬅️ Назад", callback_data="menu_targets")],
     ]
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+def get_target_locations_keyboard(target: SearchTarget) -> InlineKeyboardMarkup:
+    rows = [[InlineKeyboardButton(text="➕ Добавить локацию", callback_data=f"target_locadd_{target.target_id}")]]
+    if target.locations:
+        rows.append(
+            [InlineKeyboardButton(text="🧹 Сбросить (общая локация)", callback_data=f"target_locclear_{target.target_id}")]
+        )
+    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data=f"target_open_{target.target_id}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
 def get_add_target_keyboard() -> InlineKeyboardMarkup:
     rows = [
         [InlineKeyboardButton(text="❌ Отмена", callback_data="target_add_cancel")],
@@ -1,4 +1,6 @@
+from .ad import Ad, AdRef
 from .search_config import SearchConfig
+from .search_location import SearchLocation
 from .search_target import SearchTarget
 
-__all__ = ["SearchConfig", "SearchTarget"]
+__all__ = ["Ad", "AdRef", "SearchConfig", "SearchLocation", "SearchTarget"]
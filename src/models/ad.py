@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from typing import Any
+
+GALLERY_URL = "https://rms.kufar.by/v1/gallery/{path}"
+DESCRIPTION_LIMIT = 600
+SKIPPED_PARAMS = frozenset({"category", "type", "area", "region", "images", "coordinates"})
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _extract_images(data: dict[str, Any]) -> tuple[str, ...]:
+    images: list[Any] = []
+    image_data = data.get("images", {})
+
+    if isinstance(image_data, dict):
+        gallery = image_data.get("gallery", [])
+        if isinstance(gallery, list):
+            images = gallery
+        elif isinstance(gallery, dict):
+            images = gallery.get("images", [])
+
+        if not images:
+            images = image_data.get("listings", [])
+
+    if not images and isinstance(image_data, list):
+        for image in image_data:
+            if isinstance(image, dict) and "path" in image:
+                images.append(GALLERY_URL.format(path=image["path"]))
+            elif isinstance(image, str):
+                images.append(image)
+
+    return tuple(img for img in images if isinstance(img, str) and img.startswith("http"))
+
+
+def _extract_params(data: dict[str, Any]) -> tuple[dict[str, Any], ...]:
+    source_params = data.get("adParams") or data.get("ad_parameters")
+    if not source_params:
+        return ()
+    iterator = source_params.values() if isinstance(source_params, dict) else source_params
+    return tuple(param for param in iterator if isinstance(param, dict))
+
+
+def _parse_coordinates(value: Any) -> tuple[float, float] | None:
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        return None
+    try:
+        lon, lat = float(value[0]), float(value[1])
+    except (TypeError, ValueError):
+        return None
+    return lon, lat
+
+
+def _extract_seller(data: dict[str, Any]) -> str:
+    account_id = data.get("account_id") or data.get("accountId")
+    if account_id:
+        return str(account_id)
+    for param in data.get("account_parameters") or []:
+        if isinstance(param, dict) and param.get("p") == "name":
+            return str(param.get("v", ""))
+    return ""
+
+
+def _clean_description(data: dict[str, Any]) -> str:
+    description = data.get("description") or data.get("body") or ""
+    if not isinstance(description, str):
+        return ""
+    description = description.replace("<br>", "\n").replace("&nbsp;", " ").strip()
+    if len(description) > DESCRIPTION_LIMIT:
+        description = f"{description[:DESCRIPTION_LIMIT]}..."
+    return description
+
+
+@dataclass(frozen=True, slots=True)
+class Ad:
+    ad_id: int
+    link: str | None
+    subject: str
+    price_byn: int = 0
+    price_usd: int = 0
+    price_text: str | None = None
+    params: tuple[tuple[str, str], ...] = ()
+    description: str = ""
+    region: str | None = None
+    seller: str = ""
+    images: tuple[str, ...] = ()
+    list_time: str = ""
+    coordinates: tuple[float, float] | None = None
+
+    @classmethod
+    def from_payload(cls, data: dict[str, Any], link: str | None = None) -> "Ad":
+        params: list[tuple[str, str]] = []
+        location_parts: list[str] = []
+        coordinates = None
+        for param in _extract_params(data):
+            code = param.get("p")
+            if code == "coordinates":
+                coordinates = _parse_coordinates(param.get("v"))
+            value = param.get("vl", "")
+            if isinstance(value, list):
+                value = ", ".join(map(str, value))
+            if code in {"region", "area"} and value:
+                location_parts.append(str(value))
+            if code in SKIPPED_PARAMS:
+                continue
+            params.append((str(param.get("pl")), str(value)))
+
+        region = data.get("region")
+        if not isinstance(region, str):
+            region = ", ".join(location_parts) or None
+
+        price_text = data.get("price")
+        return cls(
+            ad_id=_to_int(data.get("ad_id") or data.get("adId")),
+            link=data.get("ad_link") or data.get("adLink") or link,
+            subject=data.get("subject") or "Без названия",
+            price_byn=_to_int(data.get("price_byn") or data.get("priceByn")),
+            price_usd=_to_int(data.get("price_usd") or data.get("priceUsd")),
+            price_text=price_text if isinstance(price_text, str) and price_text else None,
+            params=tuple(params),
+            description=_clean_description(data),
+            region=region,
+            seller=_extract_seller(data),
+            images=_extract_images(data),
+            list_time=str(data.get("list_time") or ""),
+            coordinates=coordinates,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Ad":
+        return cls(
+            **{
+                **data,
+                "params": tuple(tuple(param) for param in data.get("params", ())),
+                "images": tuple(data.get("images", ())),
+                "coordinates": _parse_coordinates(data.get("coordinates")),
+            }
+        )
+
+    def to_ref(self) -> "AdRef":
+        return AdRef(
+            ad_id=self.ad_id,
+            link=self.link,
+            subject=self.subject,
+            price_byn=self.price_byn,
+            price_usd=self.price_usd,
+            price_text=self.price_text,
+            image=self.images[0] if self.images else None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class AdRef:
+    ad_id: int
+    link: str | None
+    subject: str
+    price_byn: int = 0
+    price_usd: int = 0
+    price_text: str | None = None
+    image: str | None = None
+
+    def to_ad(self) -> Ad:
+        return Ad(
+            ad_id=self.ad_id,
+            link=self.link,
+            subject=self.subject,
+            price_byn=self.price_byn,
+            price_usd=self.price_usd,
+            price_text=self.price_text,
+            images=(self.image,) if self.image else (),
+        )
@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SearchLocation:
+    rgn: int | None = None
+    ar: int | None = None
+    label: str = "Вся Беларусь"
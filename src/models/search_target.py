@@ -1,5 +1,7 @@
 from dataclasses import dataclass, field
 
+from src.models.search_location import SearchLocation
+
 
 @dataclass
 class SearchTarget:
@@ -8,6 +10,7 @@ class SearchTarget:
     category_id: int
     extra_params: dict[str, str] = field(default_factory=dict)
     enabled: bool = True
+    locations: list[SearchLocation] = field(default_factory=list)
 
     @property
     def short_label(self) -> str:
@@ -21,3 +24,8 @@ class SearchTarget:
             parts.append(f"{key}={self.extra_params[key]}")
         return "&".join(parts)
 
+    def location_label(self, default: str) -> str:
+        if not self.locations:
+            return default
+        return "; ".join(location.label for location in self.locations)
+
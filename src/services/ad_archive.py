@@ -0,0 +1,159 @@
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import logging
+import mmap
+from pathlib import Path
+import struct
+import threading
+import time
+from typing import Any, Iterator
+import zlib
+
+from src.models.ad import Ad
+
+INDEX_ENTRY = struct.Struct("<QIIdq")
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveRecord:
+    target_id: int
+    seen_at: float
+    ad: dict[str, Any]
+
+
+class AdArchive:
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        max_segments: int = 64,
+        flush_interval: float = 2.0,
+    ):
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[tuple[int, float, Ad]] = asyncio.Queue()
+        self._segment_path: Path | None = None
+        self._segment_size = 0
+        # run() может быть отменён посреди to_thread: поток дописывает пачку, а финальный
+        # flush() стартует второй поток. Без блокировки оба пишут в сегмент с общим _segment_size.
+        self._write_lock = threading.Lock()
+
+    def append(self, target_id: int, ad: Ad) -> None:
+        self._queue.put_nowait((target_id, time.time(), ad))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        batch: list[tuple[int, float, Ad]] = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except Exception as error:
+            logging.error("Не удалось записать архив объявлений: %s", error)
+
+    def _open_segment(self) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._segment_path is None:
+            existing = sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+            if existing and existing[-1].stat().st_size < self.segment_max_bytes:
+                self._segment_path = existing[-1]
+                self._segment_size = existing[-1].stat().st_size
+                return self._segment_path
+
+        if self._segment_path is None or self._segment_size >= self.segment_max_bytes:
+            self._segment_path = self.directory / f"{time.time_ns():020d}{SEGMENT_SUFFIX}"
+            self._segment_size = 0
+            self._drop_old_segments()
+        return self._segment_path
+
+    def _drop_old_segments(self) -> None:
+        segments = sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+        for segment in segments[: max(0, len(segments) - self.max_segments + 1)]:
+            segment.unlink(missing_ok=True)
+            segment.with_suffix(INDEX_SUFFIX).unlink(missing_ok=True)
+
+    def _write_batch(self, batch: list[tuple[int, float, Ad]]) -> None:
+        with self._write_lock:
+            self._write_batch_locked(batch)
+
+    def _write_batch_locked(self, batch: list[tuple[int, float, Ad]]) -> None:
+        position = 0
+        while position < len(batch):
+            segment_path = self._open_segment()
+            index_path = segment_path.with_suffix(INDEX_SUFFIX)
+            with segment_path.open("ab") as segment, index_path.open("ab") as index:
+                while position < len(batch) and self._segment_size < self.segment_max_bytes:
+                    target_id, seen_at, ad = batch[position]
+                    payload = json.dumps(asdict(ad), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                    record = zlib.compress(payload)
+                    segment.write(record)
+                    index.write(INDEX_ENTRY.pack(self._segment_size, len(record), target_id, seen_at, ad.price_byn))
+                    self._segment_size += len(record)
+                    position += 1
+
+
+class ArchiveReader:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def query(
+        self,
+        target_id: int | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+    ) -> Iterator[ArchiveRecord]:
+        for segment_path in self.segments():
+            index_path = segment_path.with_suffix(INDEX_SUFFIX)
+            if not index_path.exists() or index_path.stat().st_size < INDEX_ENTRY.size:
+                continue
+            yield from self._query_segment(segment_path, index_path, target_id, since, until, min_price, max_price)
+
+    @staticmethod
+    def _query_segment(
+        segment_path: Path,
+        index_path: Path,
+        target_id: int | None,
+        since: float | None,
+        until: float | None,
+        min_price: int | None,
+        max_price: int | None,
+    ) -> Iterator[ArchiveRecord]:
+        with index_path.open("rb") as index_file, segment_path.open("rb") as segment_file:
+            with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index_map:
+                entries_size = len(index_map) - len(index_map) % INDEX_ENTRY.size
+                _, _, _, last_seen_at, _ = INDEX_ENTRY.unpack_from(index_map, entries_size - INDEX_ENTRY.size)
+                if since is not None and last_seen_at < since:
+                    return
+                with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as segment_map:
+                    for position in range(0, entries_size, INDEX_ENTRY.size):
+                        offset, length, record_target, seen_at, price = INDEX_ENTRY.unpack_from(index_map, position)
+                        if until is not None and seen_at > until:
+                            return
+                        if since is not None and seen_at < since:
+                            continue
+                        if target_id is not None and record_target != target_id:
+                            continue
+                        if min_price is not None and price < min_price:
+                            continue
+                        if max_price is not None and price > max_price:
+                            continue
+                        if offset + length > len(segment_map):
+                            return
+                        payload = zlib.decompress(segment_map[offset : offset + length])
+                        yield ArchiveRecord(target_id=record_target, seen_at=seen_at, ad=json.loads(payload))
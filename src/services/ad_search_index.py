@@ -0,0 +1,137 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import asdict
+from itertools import islice
+import json
+import logging
+from pathlib import Path
+import re
+import time
+from typing import Collection
+
+from src.models.ad import Ad
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> set[str]:
+    return {token for token in TOKEN_RE.findall(text.lower().replace("ё", "е")) if len(token) > 1 or token.isdigit()}
+
+
+def _ad_tokens(ad: Ad) -> set[str]:
+    parts = [ad.subject, *(value for _, value in ad.params)]
+    return tokenize(" ".join(parts))
+
+
+class AdSearchIndex:
+    def __init__(self, max_entries: int = 20000, max_age: float = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._docs: OrderedDict[int, tuple[Ad, float]] = OrderedDict()
+        self._postings: dict[str, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _index(self, ad: Ad) -> None:
+        for token in _ad_tokens(ad):
+            self._postings.setdefault(token, set()).add(ad.ad_id)
+
+    def _unindex(self, ad: Ad) -> None:
+        for token in _ad_tokens(ad):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(ad.ad_id)
+            if not postings:
+                self._postings.pop(token, None)
+
+    def add(self, ad: Ad, seen_at: float | None = None) -> None:
+        if not ad.ad_id:
+            return
+        seen_at = time.time() if seen_at is None else seen_at
+        existing = self._docs.pop(ad.ad_id, None)
+        if existing is not None:
+            previous = existing[0]
+            if previous.subject != ad.subject or previous.params != ad.params:
+                self._unindex(previous)
+                self._index(ad)
+        else:
+            self._index(ad)
+        self._docs[ad.ad_id] = (ad, seen_at)
+        self._evict(seen_at)
+
+    def get(self, ad_id: int) -> Ad | None:
+        entry = self._docs.get(ad_id)
+        return entry[0] if entry is not None else None
+
+    def remove(self, ad_id: int) -> None:
+        entry = self._docs.pop(ad_id, None)
+        if entry is not None:
+            self._unindex(entry[0])
+
+    def entries(self) -> Collection[tuple[int, tuple[Ad, float]]]:
+        return self._docs.items()
+
+    def token_entries(self) -> Collection[tuple[str, set[int]]]:
+        return self._postings.items()
+
+    def evict_oldest(self, count: int) -> int:
+        evicted = list(islice(self._docs, count))
+        for ad_id in evicted:
+            self.remove(ad_id)
+        return len(evicted)
+
+    def _evict(self, now: float) -> None:
+        while self._docs:
+            ad_id, (_, seen_at) = next(iter(self._docs.items()))
+            if len(self._docs) <= self.max_entries and now - seen_at <= self.max_age:
+                break
+            self.remove(ad_id)
+
+    def search(
+        self,
+        query: str,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        limit: int = 100,
+    ) -> list[Ad]:
+        tokens = tokenize(query)
+        if tokens:
+            postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+            candidate_ids = set(postings[0]).intersection(*postings[1:])
+            candidates = [self._docs[ad_id] for ad_id in candidate_ids if ad_id in self._docs]
+        else:
+            candidates = list(self._docs.values())
+
+        results = [
+            (ad, seen_at)
+            for ad, seen_at in candidates
+            if (min_price is None or ad.price_byn >= min_price) and (max_price is None or 0 < ad.price_byn <= max_price)
+        ]
+        results.sort(key=lambda item: item[1], reverse=True)
+        return [ad for ad, _ in results[:limit]]
+
+    def _dump(self, path: Path) -> None:
+        payload = [{"seen_at": seen_at, "ad": asdict(ad)} for ad, seen_at in self._docs.values()]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f"{path.suffix}.tmp")
+        temp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(path)
+
+    async def save(self, path: str) -> None:
+        try:
+            await asyncio.to_thread(self._dump, Path(path))
+        except Exception as error:
+            logging.warning("Не удалось сохранить поисковый индекс %s: %s", path, error)
+
+    def load(self, path: str) -> None:
+        file_path = Path(path)
+        if not file_path.exists():
+            return
+        try:
+            payload = json.loads(file_path.read_text(encoding="utf-8"))
+            for item in payload:
+                self.add(Ad.from_dict(item["ad"]), seen_at=item["seen_at"])
+        except Exception as error:
+            logging.warning("Не удалось прочитать поисковый индекс %s: %s", path, error)
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import Collection
+import zlib
+
+from src.models.ad import Ad
+
+
+@dataclass(slots=True)
+class AdState:
+    price: int
+    content_hash: int
+
+
+@dataclass(frozen=True, slots=True)
+class PriceDrop:
+    ad_id: int
+    old_price: int
+    new_price: int
+
+
+class AdStateStore:
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._states: dict[int, AdState] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, ad_id: int) -> bool:
+        return ad_id in self._states
+
+    @staticmethod
+    def _content_hash(ad: Ad) -> int:
+        parts = (ad.subject, str(ad.price_byn), str(ad.price_usd), ad.description)
+        return zlib.crc32("\x1f".join(parts).encode("utf-8"))
+
+    def observe(self, ad: Ad) -> PriceDrop | None:
+        ad_id = ad.ad_id
+        if not ad_id:
+            return None
+
+        content_hash = self._content_hash(ad)
+        state = self._states.get(ad_id)
+        if state is not None and state.content_hash == content_hash:
+            return None
+
+        price = ad.price_byn
+        if state is None:
+            self._states[ad_id] = AdState(price=price, content_hash=content_hash)
+            self._evict_overflow()
+            return None
+
+        old_price = state.price
+        state.price = price
+        state.content_hash = content_hash
+        if 0 < price < old_price:
+            return PriceDrop(ad_id=ad_id, old_price=old_price, new_price=price)
+        return None
+
+    def forget(self, ad_id: int) -> None:
+        self._states.pop(ad_id, None)
+
+    def entries(self) -> Collection[tuple[int, AdState]]:
+        return self._states.items()
+
+    def evict_oldest(self, count: int) -> int:
+        evicted = list(self._states)[:count]
+        for ad_id in evicted:
+            self._states.pop(ad_id, None)
+        return len(evicted)
+
+    def _evict_overflow(self) -> None:
+        overflow = len(self._states) - self.max_entries
+        if overflow <= 0:
+            return
+        for ad_id in list(self._states)[:overflow]:
+            self._states.pop(ad_id, None)
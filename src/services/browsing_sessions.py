@@ -0,0 +1,109 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import islice
+import time
+from typing import Collection, Iterable
+
+from src.models.ad import Ad, AdRef
+
+
+@dataclass(slots=True)
+class BrowsingSession:
+    ads: list[AdRef]
+    index: int = 0
+    target_id: int | None = None
+    title: str | None = None
+    fetch_details: bool = True
+    photos: list[str] = field(default_factory=list)
+    next_cursor: str | None = None
+    total: int | None = None
+    loading: asyncio.Task | None = None
+    touched_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def current(self) -> AdRef:
+        return self.ads[self.index]
+
+    @property
+    def total_label(self) -> str:
+        loaded = len(self.ads)
+        if not self.next_cursor:
+            return str(loaded)
+        if self.total and self.total > loaded:
+            return f"~{self.total}"
+        return f"{loaded}+"
+
+    def extend(self, ads: Iterable[Ad]) -> int:
+        known = {ref.ad_id for ref in self.ads}
+        added = [ad.to_ref() for ad in ads if ad.ad_id not in known]
+        self.ads.extend(added)
+        return len(added)
+
+
+class BrowsingSessionStore:
+    def __init__(self, ttl: float = 1800, max_sessions: int = 200):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[int, BrowsingSession] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def open(
+        self,
+        user_id: int,
+        ads: Iterable[Ad],
+        target_id: int | None = None,
+        title: str | None = None,
+        fetch_details: bool = True,
+        next_cursor: str | None = None,
+        total: int | None = None,
+    ) -> BrowsingSession:
+        session = BrowsingSession(
+            ads=[ad.to_ref() for ad in ads],
+            target_id=target_id,
+            title=title,
+            fetch_details=fetch_details,
+            next_cursor=next_cursor,
+            total=total,
+        )
+        self._sessions.pop(user_id, None)
+        self._sessions[user_id] = session
+        self._evict(session.touched_at)
+        return session
+
+    def get(self, user_id: int) -> BrowsingSession | None:
+        session = self._sessions.get(user_id)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if now - session.touched_at > self.ttl:
+            self._sessions.pop(user_id, None)
+            return None
+        session.touched_at = now
+        self._sessions.move_to_end(user_id)
+        return session
+
+    def pop(self, user_id: int) -> BrowsingSession | None:
+        return self._sessions.pop(user_id, None)
+
+    def drop_target(self, target_id: int) -> None:
+        for user_id in [user_id for user_id, session in self._sessions.items() if session.target_id == target_id]:
+            self._sessions.pop(user_id, None)
+
+    def entries(self) -> Collection[tuple[int, BrowsingSession]]:
+        return self._sessions.items()
+
+    def evict_oldest(self, count: int) -> int:
+        evicted = list(islice(self._sessions, count))
+        for user_id in evicted:
+            self._sessions.pop(user_id, None)
+        return len(evicted)
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.touched_at <= self.ttl:
+                break
+            self._sessions.pop(user_id, None)
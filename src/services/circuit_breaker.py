@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(slots=True)
+class TargetHealth:
+    state: str = CLOSED
+    failures: int = 0
+    cooldown: float = 0
+    opened_at: float | None = None
+    last_error: str | None = None
+    last_error_at: float | None = None
+
+    @property
+    def retry_in(self) -> float:
+        if self.state != OPEN or self.opened_at is None:
+            return 0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 600, max_cooldown: float = 6 * 3600):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._health: dict[int, TargetHealth] = {}
+
+    def health(self, target_id: int) -> TargetHealth:
+        return self._health.get(target_id) or TargetHealth(cooldown=self.base_cooldown)
+
+    def open_targets(self) -> set[int]:
+        return {target_id for target_id, health in self._health.items() if health.state != CLOSED}
+
+    def allow(self, target_id: int) -> bool:
+        health = self._health.get(target_id)
+        if health is None or health.state != OPEN:
+            return True
+        if health.retry_in > 0:
+            return False
+        health.state = HALF_OPEN
+        return True
+
+    def record_success(self, target_id: int) -> None:
+        health = self._health.get(target_id)
+        if health is None:
+            return
+        health.state = CLOSED
+        health.failures = 0
+        health.cooldown = self.base_cooldown
+        health.opened_at = None
+
+    def record_failure(self, target_id: int, error: str) -> bool:
+        health = self._health.setdefault(target_id, TargetHealth(cooldown=self.base_cooldown))
+        health.failures += 1
+        health.last_error = error
+        health.last_error_at = time.time()
+
+        if health.state == HALF_OPEN:
+            health.cooldown = min(health.cooldown * 2, self.max_cooldown)
+        elif health.failures < self.failure_threshold:
+            return False
+
+        just_opened = health.state == CLOSED
+        health.state = OPEN
+        health.opened_at = time.monotonic()
+        return just_opened
+
+    def forget(self, target_id: int) -> None:
+        self._health.pop(target_id, None)
@@ -0,0 +1,26 @@
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _load_backend(name: str | None) -> tuple[str, Callable[[bytes], Any]]:
+    if name in {None, "orjson"} and orjson is not None:
+        return "orjson", orjson.loads
+    if name == "orjson":
+        raise ValueError("orjson не установлен.")
+    return "json", json.loads
+
+
+class SearchDecoder:
+    def __init__(self, backend: str | None = None):
+        self.backend, self._loads = _load_backend(backend)
+
+    def decode_search(self, raw: bytes) -> dict[str, Any]:
+        data = self._loads(raw)
+        if not isinstance(data, dict):
+            return {"ads": []}
+        return data
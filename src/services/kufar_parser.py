@@ -1,13 +1,21 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import islice
 import json
 import logging
-from typing import Any
+import time
+from typing import Any, Collection
 from urllib.parse import urlencode
 
-import aiohttp
-from bs4 import BeautifulSoup
-
+from src.models.ad import Ad
 from src.models.search_config import SearchConfig
+from src.models.search_location import SearchLocation
 from src.models.search_target import SearchTarget
+from src.services.json_decoder import SearchDecoder
+from src.services.location_manager import LocationManager
+from src.services.tracing import tracer
+from src.services.transport import HttpTransport, Transport
 
 PLACEHOLDER_IMAGE = "https://placehold.co/800x600/png?text=Нет+фото"
 BASE_SEARCH_URL = "https://api.kufar.by/search-api/v2/search/rendered-paginated"
@@ -20,21 +28,54 @@ DEFAULT_SEARCH_PARAMS = {
 }
 
 
-class KufarParser:
-    def __init__(self, headers: dict[str, str]):
-        self._session: aiohttp.ClientSession | None = None
-        self._headers = headers
+class SearchError(Exception):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class SearchPage:
+    ads: list[Ad]
+    next_cursor: str | None = None
+    total: int | None = None
+
 
-    async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(headers=self._headers)
-        return self._session
+def _next_cursor(data: dict[str, Any]) -> str | None:
+    pagination = data.get("pagination")
+    pages = pagination.get("pages") if isinstance(pagination, dict) else None
+    for page in pages or []:
+        if isinstance(page, dict) and page.get("label") == "next" and page.get("token"):
+            return str(page["token"])
+    return None
+
+
+class KufarParser:
+    def __init__(
+        self,
+        headers: dict[str, str],
+        decoder: SearchDecoder | None = None,
+        transport: Transport | None = None,
+        detail_cache_size: int = 256,
+        detail_cache_ttl: float = 600,
+        locations: LocationManager | None = None,
+    ):
+        self.decoder = decoder or SearchDecoder()
+        self.transport = transport or HttpTransport(headers)
+        self.detail_cache_size = detail_cache_size
+        self.detail_cache_ttl = detail_cache_ttl
+        self._detail_cache: OrderedDict[str, tuple[Ad, float]] = OrderedDict()
+        self.locations = locations
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        await self.transport.close()
 
-    def build_url(self, config: SearchConfig, target: SearchTarget) -> str:
+    def build_url(
+        self,
+        config: SearchConfig,
+        target: SearchTarget,
+        location: SearchLocation | None = None,
+        cursor: str | None = None,
+        size: int | None = None,
+    ) -> str:
         params: dict[str, str] = {
             **DEFAULT_SEARCH_PARAMS,
             "cat": str(target.category_id),
@@ -43,41 +84,148 @@ class KufarParser:
         params.pop("rgn", None)
         params.pop("ar", None)
 
-        if config.rgn is not None:
-            params["rgn"] = str(config.rgn)
-        if config.ar is not None:
-            params["ar"] = str(config.ar)
+        rgn, ar = (location.rgn, location.ar) if location else (config.rgn, config.ar)
+        if rgn is not None:
+            params["rgn"] = str(rgn)
+        if ar is not None:
+            params["ar"] = str(ar)
+        if size is not None:
+            params["size"] = str(size)
+        if cursor:
+            params["cursor"] = cursor
 
         return f"{BASE_SEARCH_URL}?{urlencode(params)}"
 
-    async def fetch_search_results(self, config: SearchConfig, target: SearchTarget) -> list[dict[str, Any]]:
-        session = await self._get_session()
-        url = self.build_url(config, target)
+    def _in_area(self, ads: list[Ad], config: SearchConfig, location: SearchLocation | None = None) -> list[Ad]:
+        rgn, ar = (location.rgn, location.ar) if location else (config.rgn, config.ar)
+        if self.locations is None or rgn is None:
+            return ads
+        return [ad for ad in ads if self.locations.contains(rgn, ar, ad.coordinates)]
+
+    async def fetch_search_results(
+        self,
+        config: SearchConfig,
+        target: SearchTarget,
+        strict: bool = False,
+    ) -> list[Ad]:
+        if not target.locations:
+            page = await self._fetch_page(self.build_url(config, target), target.target_id, strict)
+            return self._in_area(page.ads, config)
+
+        pages = await asyncio.gather(
+            *(
+                self._fetch_page(self.build_url(config, target, location), target.target_id, strict)
+                for location in target.locations
+            ),
+            return_exceptions=True,
+        )
+        errors = [page for page in pages if isinstance(page, BaseException)]
+        if errors and len(errors) == len(pages):
+            raise errors[0]
+        merged: dict[int, Ad] = {}
+        for location, page in zip(target.locations, pages):
+            if isinstance(page, BaseException):
+                logging.warning(
+                    "Локация категории '%s' недоступна: %s",
+                    target.name,
+                    page,
+                    extra={"target_id": target.target_id, "stage": "search"},
+                )
+                continue
+            for ad in self._in_area(page.ads, config, location):
+                merged.setdefault(ad.ad_id, ad)
+        return sorted(merged.values(), key=lambda ad: ad.list_time, reverse=True)
+
+    async def fetch_search_page(
+        self,
+        config: SearchConfig,
+        target: SearchTarget,
+        cursor: str | None = None,
+        size: int | None = None,
+    ) -> SearchPage:
+        if target.locations:
+            ads = await self.fetch_search_results(config, target)
+            return SearchPage(ads=ads, total=len(ads))
+        page = await self._fetch_page(self.build_url(config, target, cursor=cursor, size=size), target.target_id)
+        return SearchPage(ads=self._in_area(page.ads, config), next_cursor=page.next_cursor, total=page.total)
+
+    async def probe(self, config: SearchConfig, target: SearchTarget) -> SearchPage:
+        location = target.locations[0] if target.locations else None
+        # Кандидат ещё не добавлен в список: его запросы не приписываются ни к одной категории.
+        return await self._fetch_page(self.build_url(config, target, location, size=1), None, strict=True)
+
+    async def _fetch_page(self, url: str, target_id: int | None, strict: bool = False) -> SearchPage:
         try:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return []
-                data = await response.json()
-                return data.get("ads", [])
+            with tracer.span("search.fetch", target_id):
+                response = await self.transport.get(url)
+            if response.status != 200:
+                raise SearchError(f"HTTP {response.status}")
+            with tracer.span("search.decode", target_id):
+                data = self.decoder.decode_search(response.body)
+                ads = [Ad.from_payload(ad) for ad in data.get("ads", []) if isinstance(ad, dict)]
+            total = data.get("total")
+            return SearchPage(
+                ads=ads,
+                next_cursor=_next_cursor(data),
+                total=total if isinstance(total, int) else None,
+            )
         except Exception as error:
-            logging.error("Ошибка поиска: %s", error)
-            return []
+            if strict:
+                if isinstance(error, SearchError):
+                    raise
+                raise SearchError(str(error) or type(error).__name__) from error
+            logging.error("Ошибка поиска: %s", error, extra={"target_id": target_id, "stage": "search"})
+            return SearchPage(ads=[])
+
+    def _cached_details(self, ad_link: str) -> Ad | None:
+        entry = self._detail_cache.get(ad_link)
+        if entry is None:
+            return None
+        ad, fetched_at = entry
+        if time.monotonic() - fetched_at > self.detail_cache_ttl:
+            self._detail_cache.pop(ad_link, None)
+            return None
+        self._detail_cache.move_to_end(ad_link)
+        return ad
+
+    def _remember_details(self, ad_link: str, ad: Ad) -> None:
+        self._detail_cache[ad_link] = (ad, time.monotonic())
+        self._detail_cache.move_to_end(ad_link)
+        while len(self._detail_cache) > self.detail_cache_size:
+            self._detail_cache.popitem(last=False)
+
+    def detail_cache_entries(self) -> Collection[tuple[str, tuple[Ad, float]]]:
+        return self._detail_cache.items()
+
+    def evict_detail_cache(self, count: int) -> int:
+        evicted = list(islice(self._detail_cache, count))
+        for ad_link in evicted:
+            self._detail_cache.pop(ad_link, None)
+        return len(evicted)
 
-    async def fetch_ad_details(self, ad_link: str) -> dict[str, Any] | None:
-        session = await self._get_session()
+    async def fetch_ad_details(self, ad_link: str) -> Ad | None:
+        cached = self._cached_details(ad_link)
+        if cached is not None:
+            return cached
         try:
-            async with session.get(ad_link) as response:
-                if response.status != 200:
-                    return None
+            with tracer.span("detail.fetch"):
+                response = await self.transport.get(ad_link)
+            if response.status != 200:
+                return None
+
+            with tracer.span("detail.parse"):
+                from bs4 import BeautifulSoup
 
-                html = await response.text()
-                soup = BeautifulSoup(html, "lxml")
+                soup = BeautifulSoup(response.body, "lxml")
                 script = soup.find("script", id="__NEXT_DATA__")
                 if not script or not script.string:
                     return None
 
                 parsed = json.loads(script.string)
-                return parsed["props"]["initialState"]["adView"]["data"]
+                data = parsed["props"]["initialState"]["adView"]["data"]
+                ad = Ad.from_payload(data, link=ad_link)
+            self._remember_details(ad_link, ad)
+            return ad
         except Exception:
             return None
 
@@ -90,79 +238,43 @@ class KufarParser:
         except (TypeError, ValueError):
             return 0
 
+    @classmethod
+    def format_byn(cls, price_value: Any) -> str | None:
+        price_byn = cls._parse_numeric_price(price_value)
+        if price_byn <= 0:
+            return None
+        return f"{price_byn:,.0f} р.".replace(",", " ")
+
+    def ad_location(self, ad: Ad) -> str:
+        if ad.region:
+            return ad.region
+        resolved = self.locations.describe(ad.coordinates) if self.locations else None
+        return resolved or "Беларусь"
+
     @staticmethod
-    def get_all_photos(ad_data: dict[str, Any]) -> list[str]:
-        images: list[str] = []
-        image_data = ad_data.get("images", {})
-
-        if isinstance(image_data, dict):
-            gallery = image_data.get("gallery", [])
-            if isinstance(gallery, list):
-                images = gallery
-            elif isinstance(gallery, dict):
-                images = gallery.get("images", [])
-
-            if not images:
-                images = image_data.get("listings", [])
-
-        if not images and isinstance(image_data, list):
-            for image in image_data:
-                if isinstance(image, dict) and "path" in image:
-                    images.append(f"https://rms.kufar.by/v1/gallery/{image['path']}")
-                elif isinstance(image, str):
-                    images.append(image)
-
-        valid_images = [img for img in images if isinstance(img, str) and img.startswith("http")]
-        return valid_images if valid_images else [PLACEHOLDER_IMAGE]
+    def get_all_photos(ad: Ad) -> list[str]:
+        return list(ad.images) if ad.images else [PLACEHOLDER_IMAGE]
 
     def format_caption(
         self,
-        ad_data: dict[str, Any],
+        ad: Ad,
         current_index: int | None = None,
-        total_count: int | None = None,
+        total_count: int | str | None = None,
     ) -> str:
-        subject = ad_data.get("subject", "Без названия")
-
-        price_str = ad_data.get("price")
-        if not price_str:
-            price_byn = self._parse_numeric_price(ad_data.get("price_byn"))
-            if price_byn > 0:
-                price_str = f"{price_byn:,.0f} р.".replace(",", " ")
-            else:
-                price_str = "Договорная"
-
-        price_usd = self._parse_numeric_price(ad_data.get("price_usd") or ad_data.get("priceUsd"))
+        price_str = ad.price_text or self.format_byn(ad.price_byn) or "Договорная"
+        price_usd = self._parse_numeric_price(ad.price_usd)
         if price_usd > 0:
             price_str += f" (~${price_usd:,.0f})"
 
-        params: list[str] = []
-        source_params = ad_data.get("adParams") or ad_data.get("ad_parameters")
-        if source_params:
-            iterator = source_params.values() if isinstance(source_params, dict) else source_params
-            for param in iterator:
-                if not isinstance(param, dict):
-                    continue
-                if param.get("p") in {"category", "type", "area", "region", "images"}:
-                    continue
-                value = param.get("vl", "")
-                if isinstance(value, list):
-                    value = ", ".join(map(str, value))
-                params.append(f"▫️ {param.get('pl')}: {value}")
-
-        description = ad_data.get("description") or ad_data.get("body") or ""
-        description = description.replace("<br>", "\n").replace("&nbsp;", " ").strip()
-        if len(description) > 600:
-            description = f"{description[:600]}..."
-
         header = ""
         if current_index is not None and total_count is not None:
             header = f"🗂 <b>{current_index + 1} из {total_count}</b>\n"
 
-        params_text = "\n".join(params[:5])
+        params_text = "\n".join(f"▫️ {label}: {value}" for label, value in ad.params[:5])
         return (
-            f"{header}📱 <b>{subject}</b>\n"
+            f"{header}📱 <b>{ad.subject}</b>\n"
             f"💰 <b>{price_str}</b>\n\n"
             f"{params_text}\n\n"
-            f"📝 <i>{description}</i>\n\n"
-            f"📍 {ad_data.get('region', 'Беларусь')}\n"
+            f"📝 <i>{ad.description}</i>\n\n"
+            f"📍 {self.ad_location(ad)}\n"
         )
@@ -1,12 +1,60 @@
+from dataclasses import dataclass
 import json
+import math
 from pathlib import Path
+from typing import Any
+
+GRID_STEP = 0.1
+
+
+@dataclass(frozen=True, slots=True)
+class LocationBox:
+    region_id: int
+    area_id: int | None
+    name: str
+    bbox: tuple[float, float, float, float]
+
+    @property
+    def size(self) -> float:
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        return (max_lon - min_lon) * (max_lat - min_lat)
+
+    def contains(self, lon: float, lat: float) -> bool:
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        return min_lon <= lon <= max_lon and min_lat <= lat <= max_lat
+
+
+def _parse_bbox(value: Any) -> tuple[float, float, float, float] | None:
+    if not isinstance(value, list) or len(value) != 4:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(item) for item in value)
+    except (TypeError, ValueError):
+        return None
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _union(
+    first: tuple[float, float, float, float],
+    second: tuple[float, float, float, float],
+) -> tuple[float, float, float, float]:
+    return (
+        min(first[0], second[0]),
+        min(first[1], second[1]),
+        max(first[2], second[2]),
+        max(first[3], second[3]),
+    )
 
 
 class LocationManager:
     def __init__(self, filepath: str):
         self.regions: dict[int, str] = {}
         self.areas: dict[int, dict[int, str]] = {}
+        self.region_boxes: dict[int, LocationBox] = {}
+        self.area_boxes: dict[tuple[int, int], LocationBox] = {}
+        self._grid: dict[tuple[int, int], list[LocationBox]] = {}
         self.load_data(filepath)
+        self._build_grid()
 
     def load_data(self, filepath: str) -> None:
         path = Path(filepath)
@@ -21,10 +69,12 @@ class LocationManager:
                 region_id = int(item["region"])
                 self.regions[region_id] = item["labels"]["ru"]
                 self.areas.setdefault(region_id, {})
+                self._add_region_box(region_id, item)
 
             if item.get("region") == 7 and item.get("type") == "city":
                 self.regions[7] = "Минск"
                 self.areas.setdefault(7, {})
+                self._add_region_box(7, item)
 
         for item in data:
             region_id = item.get("region")
@@ -37,4 +87,61 @@ class LocationManager:
             area_name = item["labels"]["ru"]
             if region_int in self.areas:
                 self.areas[region_int][area_int] = area_name
+                self._add_area_box(region_int, area_int, area_name, item)
+
+    def _add_region_box(self, region_id: int, item: dict[str, Any]) -> None:
+        bbox = _parse_bbox(item.get("bbox"))
+        if bbox:
+            self.region_boxes[region_id] = LocationBox(region_id, None, self.regions[region_id], bbox)
+
+    def _add_area_box(self, region_id: int, area_id: int, name: str, item: dict[str, Any]) -> None:
+        bbox = _parse_bbox(item.get("bbox"))
+        if not bbox:
+            return
+        existing = self.area_boxes.get((region_id, area_id))
+        if existing:
+            bbox = _union(existing.bbox, bbox)
+            name = existing.name
+        self.area_boxes[(region_id, area_id)] = LocationBox(region_id, area_id, name, bbox)
+
+    @staticmethod
+    def _cell(lon: float, lat: float) -> tuple[int, int]:
+        return math.floor(lon / GRID_STEP), math.floor(lat / GRID_STEP)
+
+    def _build_grid(self) -> None:
+        self._grid.clear()
+        for box in sorted(self.area_boxes.values(), key=lambda box: box.size):
+            min_x, min_y = self._cell(box.bbox[0], box.bbox[1])
+            max_x, max_y = self._cell(box.bbox[2], box.bbox[3])
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    self._grid.setdefault((x, y), []).append(box)
+
+    def locate(self, lon: float, lat: float) -> LocationBox | None:
+        for box in self._grid.get(self._cell(lon, lat), ()):
+            if box.contains(lon, lat):
+                return box
+        regions = [box for box in self.region_boxes.values() if box.contains(lon, lat)]
+        return min(regions, key=lambda box: box.size) if regions else None
+
+    def describe(self, coordinates: tuple[float, float] | None) -> str | None:
+        if not coordinates:
+            return None
+        box = self.locate(*coordinates)
+        if box is None:
+            return None
+        region_name = self.regions.get(box.region_id)
+        if box.area_id is None or not region_name or region_name == box.name:
+            return box.name
+        return f"{box.name}, {region_name}"
 
+    def contains(
+        self,
+        region_id: int | None,
+        area_id: int | None,
+        coordinates: tuple[float, float] | None,
+    ) -> bool:
+        if not coordinates or region_id is None:
+            return True
+        box = self.area_boxes.get((region_id, area_id)) if area_id is not None else self.region_boxes.get(region_id)
+        return box is None or box.contains(*coordinates)
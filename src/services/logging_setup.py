@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import sys
+import time
+
+STRUCTURED_FIELDS = ("target_id", "ad_id", "stage")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, window: float = 60, min_level: int = logging.WARNING, max_keys: int = 1000):
+        super().__init__()
+        self.window = window
+        self.min_level = min_level
+        self.max_keys = max_keys
+        self._seen: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+
+        # Ключ по готовому тексту: исключение в args каждый раз новый объект, но текст у него тот же.
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.msg} (ещё {entry[1]} повторов за {self.window:.0f} с)"
+        self._seen[key] = [now, 0]
+        if len(self._seen) > self.max_keys:
+            expired = [seen_key for seen_key, (first_at, _) in self._seen.items() if now - first_at >= self.window]
+            for seen_key in expired or list(self._seen)[: len(self._seen) - self.max_keys]:
+                self._seen.pop(seen_key, None)
+        return True
+
+
+class _LoopQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Очередь внутри процесса: форматирование оставляем потоку слушателя.
+        return record
+
+
+def setup_logging(level: int = logging.INFO, json_output: bool = False, rate_limit_window: float = 60) -> QueueListener:
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = _LoopQueueHandler(log_queue)
+    if rate_limit_window > 0:
+        queue_handler.addFilter(RateLimitFilter(rate_limit_window))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_logging(listener: QueueListener) -> None:
+    listener.stop()
+    # Очередь больше никто не читает: дальнейшие записи идут в обработчики слушателя напрямую.
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
@@ -0,0 +1,140 @@
+import asyncio
+from dataclasses import dataclass
+from itertools import islice
+import logging
+import math
+import sys
+from typing import Any, Callable, Collection
+
+DEFAULT_SAMPLE_SIZE = 32
+
+
+def deep_sizeof(obj: Any, seen: set[int] | None = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def estimate_size(entries: Collection[Any], sample_size: int = DEFAULT_SAMPLE_SIZE) -> int:
+    count = len(entries)
+    if not count:
+        return 0
+    sample = list(islice(iter(entries), sample_size))
+    if not sample:
+        return 0
+    return round(sum(deep_sizeof(entry) for entry in sample) / len(sample) * count)
+
+
+@dataclass(frozen=True, slots=True)
+class CacheUsage:
+    name: str
+    priority: int | None
+    entries: int
+    size: int
+    evicted: int
+
+
+@dataclass(slots=True)
+class _Registration:
+    name: str
+    entries: Callable[[], Collection[Any]]
+    evict: Callable[[int], int] | None
+    priority: int | None
+    evicted: int = 0
+
+
+class MemoryGovernor:
+    def __init__(self, budget: int = 0, interval: float = 30, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        self.budget = budget
+        self.interval = interval
+        self.sample_size = sample_size
+        self.evictions = 0
+        self.last_total = 0
+        self._caches: dict[str, _Registration] = {}
+
+    def register(
+        self,
+        name: str,
+        entries: Callable[[], Collection[Any]],
+        evict: Callable[[int], int] | None = None,
+        priority: int | None = None,
+    ) -> None:
+        # priority: чем меньше, тем раньше кэш отдаёт память; без evict кэш только учитывается.
+        self._caches[name] = _Registration(name, entries, evict, priority if evict else None)
+
+    def usage(self) -> list[CacheUsage]:
+        usage = []
+        for cache in self._caches.values():
+            entries = cache.entries()
+            usage.append(
+                CacheUsage(
+                    name=cache.name,
+                    priority=cache.priority,
+                    entries=len(entries),
+                    size=estimate_size(entries, self.sample_size),
+                    evicted=cache.evicted,
+                )
+            )
+        self.last_total = sum(item.size for item in usage)
+        return usage
+
+    def enforce(self) -> int:
+        usage = self.usage()
+        excess = self.last_total - self.budget
+        if self.budget <= 0 or excess <= 0:
+            return 0
+
+        freed = 0
+        evictable = sorted(
+            (item for item in usage if item.priority is not None and item.entries),
+            key=lambda item: item.priority,
+        )
+        for item in evictable:
+            per_entry = item.size / item.entries
+            count = min(item.entries, math.ceil(excess / per_entry)) if per_entry else item.entries
+            cache = self._caches[item.name]
+            evicted = cache.evict(count)
+            cache.evicted += evicted
+            self.evictions += evicted
+            freed += round(evicted * per_entry)
+            excess -= evicted * per_entry
+            logging.info(
+                "Бюджет памяти: из %s вытеснено %s записей (~%.1f КБ).",
+                item.name,
+                evicted,
+                evicted * per_entry / 1024,
+            )
+            if excess <= 0:
+                break
+
+        self.last_total -= freed
+        if excess > 0:
+            logging.warning(
+                "Бюджет памяти %.1f МБ превышен на %.1f МБ за счёт невытесняемых кэшей.",
+                self.budget / 2**20,
+                excess / 2**20,
+            )
+        return freed
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.enforce()
+            except Exception:
+                logging.exception("Ошибка учёта памяти кэшей")
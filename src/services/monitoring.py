@@ -1,90 +1,411 @@
 import asyncio
+from dataclasses import dataclass
 import logging
+import time
 from html import escape
 
 from aiogram import Bot
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
 
 from src.app_context import AppContext
 from src.config import AppConfig
+from src.models.ad import Ad
+from src.models.search_config import SearchConfig
 from src.models.search_target import SearchTarget
 from src.keyboards.ads import get_monitor_keyboard
+from src.services.ad_archive import AdArchive
+from src.services.ad_state_store import PriceDrop
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.kufar_parser import PLACEHOLDER_IMAGE, SearchError
+from src.services.target_storage import TargetsDiff
+from src.services.tracing import tracer
+
+RECENT_ALERT_TTL = 6 * 3600
+SEARCH_CONCURRENCY = 4
+SEND_RETRY_LIMIT = 3
+
+
+@dataclass
+class PendingAlert:
+    ad: Ad
+    targets: list[SearchTarget]
+    price_drop: PriceDrop | None = None
+
+    @property
+    def target_names(self) -> str:
+        return ", ".join(target.name for target in self.targets)
+
+    def add_target(self, target: SearchTarget) -> None:
+        if all(existing.target_id != target.target_id for existing in self.targets):
+            self.targets.append(target)
 
 
 class MonitoringService:
-    def __init__(self, context: AppContext, bot: Bot, config: AppConfig):
+    def __init__(self, context: AppContext, bot: Bot, config: AppConfig, archive: AdArchive | None = None):
         self.context = context
         self.bot = bot
         self.config = config
+        self.archive = archive
+        self.send_delay = 1.0
+        self.last_heartbeat = time.monotonic()
+        self.last_cycle_at: float | None = None
+        self.last_success_by_target: dict[int, float] = {}
+        self._recent_alerts: dict[int, float] = {}
+        self.send_retries = 0
+        self.retry_wait_total = 0.0
+        self.baseline_ready: set[int] = set()
+        self.baseline_task: asyncio.Task | None = None
+        self.breaker = CircuitBreaker()
+        self._baselining: set[int] = set()
+        self._search_semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+    async def _record_search_failure(self, target: SearchTarget, error: SearchError) -> None:
+        logging.warning(
+            "Ошибка поиска '%s': %s",
+            target.name,
+            error,
+            extra={"target_id": target.target_id, "stage": "search"},
+        )
+        if not self.breaker.record_failure(target.target_id, str(error)):
+            return
+        health = self.breaker.health(target.target_id)
+        logging.warning(
+            "Категория '%s' исключена из опроса на %.0f с.",
+            target.name,
+            health.cooldown,
+            extra={"target_id": target.target_id, "stage": "breaker"},
+        )
+        try:
+            await self.bot.send_message(
+                self.config.user_id,
+                (
+                    f"⚠️ Категория <b>{escape(target.name)}</b> не отвечает "
+                    f"{health.failures} раза подряд и временно не опрашивается.\n"
+                    f"Ошибка: <code>{escape(str(error))}</code>"
+                ),
+                parse_mode=ParseMode.HTML,
+            )
+        except Exception as send_error:
+            logging.error("Не удалось отправить предупреждение о категории %s: %s", target.target_id, send_error)
 
     async def update_target_baseline(self, target: SearchTarget) -> int:
-        seen_set = self.context.seen_ads_by_target.setdefault(target.target_id, set())
-        seen_set.clear()
-        ads = await self.context.parser.fetch_search_results(self.context.search_config, target)
-        for ad in ads:
-            ad_id = ad.get("ad_id")
-            if ad_id:
-                seen_set.add(ad_id)
-        logging.info("Baseline обновлён для '%s': %s объявлений.", target.name, len(ads))
+        self.baseline_ready.discard(target.target_id)
+        self._baselining.add(target.target_id)
+        config = self.context.search_config_snapshot()
+        try:
+            # Блокировка цели держится на весь поиск: параллельный опрос этой же цели
+            # не сравнит свежую выдачу со старым seen, а baseline не затрёт его на полпути.
+            async with self.context.target_lock(target.target_id):
+                try:
+                    async with self._search_semaphore:
+                        ads = await self.context.parser.fetch_search_results(config, target, strict=True)
+                except SearchError as error:
+                    failure = error
+                else:
+                    failure = None
+                    seen_set: set[int] = set()
+                    for ad in ads:
+                        if ad.ad_id:
+                            seen_set.add(ad.ad_id)
+                            self.context.ad_states.observe(ad)
+                            self.context.search_index.add(ad)
+                            self.context.repost_index.check(ad)
+                    if self.context.replace_seen(target.target_id, seen_set):
+                        self.baseline_ready.add(target.target_id)
+        finally:
+            self._baselining.discard(target.target_id)
+
+        if failure:
+            await self._record_search_failure(target, failure)
+            return 0
+        self.breaker.record_success(target.target_id)
+        logging.info(
+            "Baseline обновлён для '%s': %s объявлений.",
+            target.name,
+            len(ads),
+            extra={"target_id": target.target_id, "stage": "baseline"},
+        )
         return len(ads)
 
+    async def update_targets_baseline(self, targets: list[SearchTarget]) -> int:
+        counts = await asyncio.gather(
+            *(self.update_target_baseline(target) for target in targets if target.enabled)
+        )
+        return sum(counts)
+
     async def update_all_baselines(self) -> int:
-        total = 0
-        for target in self.context.targets.values():
-            if not target.enabled:
+        return await self.update_targets_baseline(list(self.context.targets.values()))
+
+    async def update_global_location_baselines(self) -> int:
+        return await self.update_targets_baseline(
+            [target for target in self.context.targets.values() if not target.locations]
+        )
+
+    def start_baselines(self) -> asyncio.Task:
+        self.baseline_task = asyncio.create_task(self._run_startup_baselines())
+        return self.baseline_task
+
+    async def _run_startup_baselines(self) -> None:
+        started = time.monotonic()
+        total = await self.update_all_baselines()
+        logging.info("Стартовые baseline готовы за %.1f с: %s объявлений.", time.monotonic() - started, total)
+
+    def forget_target(self, target_id: int) -> None:
+        self.baseline_ready.discard(target_id)
+        self.breaker.forget(target_id)
+        self.last_success_by_target.pop(target_id, None)
+
+    async def apply_targets_diff(self, diff: TargetsDiff) -> None:
+        for target_id in diff.removed:
+            tracer.forget_target(target_id)
+            self.forget_target(target_id)
+        targets = [target for target in [*diff.added, *diff.rebaseline] if target.enabled]
+        for target in targets:
+            # Пока идёт новый baseline, run_cycle не должен опрашивать цель со старым seen.
+            self.baseline_ready.discard(target.target_id)
+            self.breaker.forget(target.target_id)
+        if targets:
+            await self.update_targets_baseline(targets)
+
+    async def _send_alert(
+        self,
+        alert: PendingAlert,
+        photo: str,
+        caption: str,
+        keyboard: InlineKeyboardMarkup,
+    ) -> bool:
+        ad_id = alert.ad.ad_id
+        candidates = [photo] if photo == PLACEHOLDER_IMAGE else [photo, PLACEHOLDER_IMAGE]
+        for candidate in candidates:
+            try:
+                await self._send_photo(alert.targets[0].target_id, candidate, caption, keyboard)
+                return True
+            except Exception as error:
+                logging.error(
+                    "Не удалось отправить объявление %s (%s): %s",
+                    ad_id,
+                    candidate,
+                    error,
+                    extra={"target_id": alert.targets[0].target_id, "ad_id": ad_id, "stage": "send"},
+                )
+        return False
+
+    async def _send_photo(self, target_id: int, photo: str, caption: str, keyboard: InlineKeyboardMarkup) -> None:
+        for attempt in range(SEND_RETRY_LIMIT + 1):
+            try:
+                with tracer.span("telegram.send_photo", target_id):
+                    await self.bot.send_photo(
+                        self.config.user_id,
+                        photo=photo,
+                        caption=caption,
+                        reply_markup=keyboard,
+                        parse_mode=ParseMode.HTML,
+                    )
+                return
+            except TelegramRetryAfter as error:
+                if attempt == SEND_RETRY_LIMIT:
+                    raise
+                self.send_retries += 1
+                self.retry_wait_total += error.retry_after
+                logging.warning(
+                    "Telegram ограничил отправку, повтор через %s с",
+                    error.retry_after,
+                    extra={"target_id": target_id, "stage": "send"},
+                )
+                self.last_heartbeat = time.monotonic()
+                await asyncio.sleep(error.retry_after)
+
+    def _targets_header(self, targets: list[SearchTarget]) -> str:
+        names = ", ".join(f"<b>{escape(target.name)}</b>" for target in targets)
+        return f"🏷 {names}\n"
+
+    def _prune_recent_alerts(self) -> None:
+        now = time.monotonic()
+        expired = [ad_id for ad_id, sent_at in self._recent_alerts.items() if now - sent_at > RECENT_ALERT_TTL]
+        for ad_id in expired:
+            self._recent_alerts.pop(ad_id, None)
+
+    async def _notify_new_ad(self, alert: PendingAlert) -> None:
+        ad = alert.ad
+        ad_id = ad.ad_id
+        link = ad.link
+        target_id = alert.targets[0].target_id
+        with tracer.span("detail", target_id):
+            details = await self.context.parser.fetch_ad_details(link) if link else None
+        payload = details if details else ad
+
+        with tracer.span("caption.format", target_id):
+            caption = self.context.parser.format_caption(payload)
+        caption = f"{self._targets_header(alert.targets)}{caption}"
+        with tracer.span("photo.resolve", target_id):
+            photos = await self.context.photo_resolver.resolve(self.context.parser.get_all_photos(payload))
+
+        cache_key = f"track_{target_id}_{ad_id}"
+        if len(photos) > 1:
+            self.context.ad_photos_cache[cache_key] = photos
+
+        keyboard = get_monitor_keyboard(
+            link or "https://www.kufar.by/",
+            cache_key,
+            len(photos) > 1,
+        )
+        if await self._send_alert(alert, photos[0], caption, keyboard):
+            self._recent_alerts[ad_id] = time.monotonic()
+            logging.info(
+                "Новое объявление %s [%s]",
+                ad_id,
+                alert.target_names,
+                extra={"target_id": target_id, "ad_id": ad_id, "stage": "notify"},
+            )
+
+    async def _notify_price_drop(self, alert: PendingAlert) -> None:
+        ad = alert.ad
+        drop = alert.price_drop
+        parser = self.context.parser
+        old_price = parser.format_byn(drop.old_price) or "Договорная"
+        new_price = parser.format_byn(drop.new_price) or "Договорная"
+        with tracer.span("caption.format", alert.targets[0].target_id):
+            caption = parser.format_caption(ad)
+        caption = (
+            f"{self._targets_header(alert.targets)}"
+            f"📉 <b>Цена снижена:</b> <s>{old_price}</s> → <b>{new_price}</b>\n"
+            f"{caption}"
+        )
+        photos = await self.context.photo_resolver.resolve(parser.get_all_photos(ad))
+        link = ad.link or "https://www.kufar.by/"
+        cache_key = f"track_{alert.targets[0].target_id}_{drop.ad_id}"
+        if len(photos) > 1:
+            self.context.ad_photos_cache[cache_key] = photos
+
+        keyboard = get_monitor_keyboard(link, cache_key, len(photos) > 1)
+        if await self._send_alert(alert, photos[0], caption, keyboard):
+            logging.info(
+                "Снижение цены %s [%s]: %s -> %s",
+                drop.ad_id,
+                alert.target_names,
+                drop.old_price,
+                drop.new_price,
+                extra={"target_id": alert.targets[0].target_id, "ad_id": drop.ad_id, "stage": "price_drop"},
+            )
+
+    async def _poll_target(self, target: SearchTarget, config: SearchConfig) -> list[tuple[Ad, bool]] | None:
+        if not self.breaker.allow(target.target_id):
+            return None
+        async with self.context.target_lock(target.target_id):
+            if target.target_id not in self.baseline_ready:
+                # Пока ждали блокировку, цель ушла на новый baseline.
+                return None
+            try:
+                async with self._search_semaphore:
+                    new_ads = await self.context.parser.fetch_search_results(config, target, strict=True)
+            except SearchError as error:
+                failure = error
+            else:
+                failure = None
+                seen_set = self.context.seen_ads_by_target.get(target.target_id)
+                if seen_set is None:
+                    return None
+                polled: list[tuple[Ad, bool]] = []
+                for ad in reversed(new_ads):
+                    if ad.ad_id:
+                        polled.append((ad, ad.ad_id not in seen_set))
+                        seen_set.add(ad.ad_id)
+
+        self.last_heartbeat = time.monotonic()
+        if failure:
+            await self._record_search_failure(target, failure)
+            return None
+        self.breaker.record_success(target.target_id)
+        self.last_success_by_target[target.target_id] = time.time()
+        return polled
+
+    async def _collect_alerts(self, targets: list[SearchTarget]) -> list[PendingAlert]:
+        new_alerts: dict[int, PendingAlert] = {}
+        price_alerts: dict[int, PendingAlert] = {}
+        self._prune_recent_alerts()
+
+        config = self.context.search_config_snapshot()
+        results = await asyncio.gather(*(self._poll_target(target, config) for target in targets))
+        for target, polled in zip(targets, results):
+            if polled is None:
                 continue
-            total += await self.update_target_baseline(target)
-        return total
+            for ad, is_new in polled:
+                ad_id = ad.ad_id
+                price_drop = self.context.ad_states.observe(ad)
+                self.context.search_index.add(ad)
+                if not is_new:
+                    if ad_id in price_alerts:
+                        price_alerts[ad_id].add_target(target)
+                    elif price_drop:
+                        price_alerts[ad_id] = PendingAlert(ad=ad, targets=[target], price_drop=price_drop)
+                    continue
+
+                if self.archive:
+                    self.archive.append(target.target_id, ad)
+                if ad_id in new_alerts:
+                    new_alerts[ad_id].add_target(target)
+                    continue
+
+                if ad_id in self._recent_alerts:
+                    continue
+
+                original_id = self.context.repost_index.check(ad)
+                if original_id:
+                    logging.info(
+                        "Пропущен репост %s (оригинал %s) [%s]",
+                        ad_id,
+                        original_id,
+                        target.name,
+                        extra={"target_id": target.target_id, "ad_id": ad_id, "stage": "repost"},
+                    )
+                    continue
+
+                new_alerts[ad_id] = PendingAlert(ad=ad, targets=[target])
+
+        return [*new_alerts.values(), *price_alerts.values()]
+
+    async def run_cycle(self) -> int:
+        pending_targets: list[SearchTarget] = []
+        if self.baseline_task is None or self.baseline_task.done():
+            pending_targets = [
+                target
+                for target in self.context.get_active_targets()
+                if target.target_id not in self.baseline_ready
+                and target.target_id not in self._baselining
+                and self.breaker.allow(target.target_id)
+            ]
+        if pending_targets:
+            await self.update_targets_baseline(pending_targets)
+
+        retried = {target.target_id for target in pending_targets}
+        active_targets = [
+            target
+            for target in self.context.get_active_targets()
+            if target.target_id in self.baseline_ready and target.target_id not in retried
+        ]
+        if not active_targets:
+            return 0
+
+        with tracer.span("cycle.collect"):
+            alerts = await self._collect_alerts(active_targets)
+        for alert in alerts:
+            if alert.price_drop:
+                await self._notify_price_drop(alert)
+            else:
+                await self._notify_new_ad(alert)
+            self.last_heartbeat = time.monotonic()
+            await asyncio.sleep(self.send_delay)
+        self.last_cycle_at = time.time()
+        return len(alerts)
 
     async def background_monitoring(self) -> None:
         logging.info("Мониторинг запущен.")
         while True:
+            self.last_heartbeat = time.monotonic()
             await asyncio.sleep(self.config.check_interval)
             try:
-                active_targets = self.context.get_active_targets()
-                if not active_targets:
-                    continue
-
-                for target in active_targets:
-                    new_ads = await self.context.parser.fetch_search_results(self.context.search_config, target)
-                    seen_set = self.context.seen_ads_by_target.setdefault(target.target_id, set())
-                    for ad in reversed(new_ads):
-                        ad_id = ad.get("ad_id")
-                        if not ad_id or ad_id in seen_set:
-                            continue
-
-                        seen_set.add(ad_id)
-
-                        link = ad.get("ad_link")
-                        details = await self.context.parser.fetch_ad_details(link) if link else None
-                        payload = details if details else ad
-
-                        caption = self.context.parser.format_caption(payload)
-                        caption = f"🏷 <b>{escape(target.name)}</b>\n{caption}"
-                        photos = self.context.parser.get_all_photos(payload)
-
-                        cache_key = f"track_{target.target_id}_{ad_id}"
-                        if len(photos) > 1:
-                            self.context.ad_photos_cache[cache_key] = photos
-
-                        keyboard = get_monitor_keyboard(
-                            link or "https://www.kufar.by/",
-                            cache_key,
-                            len(photos) > 1,
-                        )
-
-                        try:
-                            await self.bot.send_photo(
-                                self.config.user_id,
-                                photo=photos[0],
-                                caption=caption,
-                                reply_markup=keyboard,
-                                parse_mode=ParseMode.HTML,
-                            )
-                            logging.info("Новое объявление %s [%s]", ad_id, target.name)
-                        except Exception as error:
-                            logging.error("Не удалось отправить объявление %s: %s", ad_id, error)
-
-                        await asyncio.sleep(1)
+                await self.run_cycle()
             except Exception as error:
-                logging.error("Ошибка мониторинга: %s", error)
+                logging.exception("Ошибка мониторинга: %s", error, extra={"stage": "cycle"})
@@ -0,0 +1,111 @@
+import asyncio
+from collections import OrderedDict
+from itertools import islice
+import logging
+import time
+from typing import Collection
+
+from src.services.kufar_parser import PLACEHOLDER_IMAGE
+from src.services.transport import Transport
+
+TELEGRAM_PHOTO_URL_LIMIT = 5 * 1024 * 1024
+KUFAR_GALLERY_PREFIX = "https://rms.kufar.by/v1/gallery/"
+KUFAR_SIZE_VARIANTS = ("gallery", "list_thumbs_2x")
+
+
+def size_variants(url: str) -> list[str]:
+    if not url.startswith(KUFAR_GALLERY_PREFIX):
+        return [url]
+    path = url[len(KUFAR_GALLERY_PREFIX) :]
+    return [f"https://rms.kufar.by/v1/{variant}/{path}" for variant in KUFAR_SIZE_VARIANTS]
+
+
+class PhotoResolver:
+    def __init__(
+        self,
+        transport: Transport,
+        timeout: float = 3.0,
+        budget: float = 6.0,
+        max_candidates: int = 3,
+        cache_size: int = 5000,
+        cache_ttl: float = 3600,
+    ):
+        self.transport = transport
+        self.timeout = timeout
+        self.budget = budget
+        self.max_candidates = max_candidates
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+
+    def _cached(self, url: str) -> bool | None:
+        entry = self._cache.get(url)
+        if entry is None:
+            return None
+        is_valid, checked_at = entry
+        if time.monotonic() - checked_at > self.cache_ttl:
+            self._cache.pop(url, None)
+            return None
+        self._cache.move_to_end(url)
+        return is_valid
+
+    def _remember(self, url: str, is_valid: bool) -> None:
+        self._cache[url] = (is_valid, time.monotonic())
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def entries(self) -> Collection[tuple[str, tuple[bool, float]]]:
+        return self._cache.items()
+
+    def evict_oldest(self, count: int) -> int:
+        evicted = list(islice(self._cache, count))
+        for url in evicted:
+            self._cache.pop(url, None)
+        return len(evicted)
+
+    async def is_valid(self, url: str) -> bool:
+        cached = self._cached(url)
+        if cached is not None:
+            return cached
+
+        try:
+            response = await self.transport.head(url, self.timeout)
+            is_valid = (
+                response.status == 200
+                and (not response.content_type or response.content_type.startswith("image/"))
+                and (response.content_length is None or response.content_length <= TELEGRAM_PHOTO_URL_LIMIT)
+            )
+        except Exception as error:
+            logging.info("Фото недоступно %s: %s", url, error)
+            is_valid = False
+        self._remember(url, is_valid)
+        return is_valid
+
+    async def _pick_variant(self, photo: str) -> str | None:
+        for variant in size_variants(photo):
+            if await self.is_valid(variant):
+                return variant
+        return None
+
+    async def resolve(self, photos: list[str]) -> list[str]:
+        primary = PLACEHOLDER_IMAGE
+        primary_source = None
+        try:
+            async with asyncio.timeout(self.budget):
+                for photo in photos[: self.max_candidates]:
+                    if photo == PLACEHOLDER_IMAGE:
+                        break
+                    variant = await self._pick_variant(photo)
+                    if variant:
+                        primary, primary_source = variant, photo
+                        break
+        except TimeoutError:
+            logging.info("Проверка фото не уложилась в %.1f с, используется заглушка", self.budget)
+
+        rest = [
+            url
+            for url in photos
+            if url not in {primary_source, PLACEHOLDER_IMAGE} and self._cached(url) is not False
+        ]
+        return [primary, *rest]
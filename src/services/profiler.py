@@ -0,0 +1,76 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import os
+import sys
+import threading
+import time
+from types import FrameType
+
+
+@dataclass
+class ProfileReport:
+    duration: float
+    samples: int = 0
+    self_counts: Counter[str] = field(default_factory=Counter)
+    total_counts: Counter[str] = field(default_factory=Counter)
+
+    def top(self, limit: int = 10) -> list[tuple[str, int, int]]:
+        return [
+            (name, self_count, self.total_counts[name])
+            for name, self_count in self.self_counts.most_common(limit)
+        ]
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = os.path.relpath(code.co_filename) if code.co_filename.startswith(os.getcwd()) else code.co_filename
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _sample_loop(self, thread_id: int, report: ProfileReport, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            report.samples += 1
+            report.self_counts[_frame_name(frame)] += 1
+            seen: set[str] = set()
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                name = _frame_name(frame)
+                if name not in seen:
+                    seen.add(name)
+                    report.total_counts[name] += 1
+                frame = frame.f_back
+                depth += 1
+
+    async def profile(self, seconds: float) -> ProfileReport:
+        async with self._lock:
+            report = ProfileReport(duration=seconds)
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._sample_loop,
+                args=(threading.get_ident(), report, stop),
+                name="sampling-profiler",
+                daemon=True,
+            )
+            started = time.monotonic()
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+                report.duration = time.monotonic() - started
+            return report
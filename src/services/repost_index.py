@@ -0,0 +1,80 @@
+import re
+import time
+from typing import Any, Collection
+import zlib
+
+from src.models.ad import Ad
+
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+class RepostIndex:
+    def __init__(self, window_seconds: int = 86400, max_entries: int = 50000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._entries: dict[int, tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    @staticmethod
+    def _normalize_subject(subject: Any) -> str:
+        return _NON_WORD_RE.sub(" ", str(subject or "").lower()).strip()
+
+    @classmethod
+    def fingerprint(cls, ad: Ad) -> int | None:
+        subject = cls._normalize_subject(ad.subject)
+        if not subject:
+            return None
+        first_image = ad.images[0] if ad.images else ""
+        parts = (subject, str(ad.price_byn), ad.seller, first_image)
+        return zlib.crc32("\x1f".join(parts).encode("utf-8"))
+
+    def check(self, ad: Ad) -> int | None:
+        if not self.enabled:
+            return None
+        ad_id = ad.ad_id
+        fingerprint = self.fingerprint(ad)
+        if not ad_id or fingerprint is None:
+            return None
+
+        now = time.monotonic()
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            original_id, seen_at = entry
+            if original_id != ad_id and now - seen_at <= self.window_seconds:
+                self._entries.pop(fingerprint, None)
+                self._entries[fingerprint] = (original_id, now)
+                return original_id
+
+        self._entries.pop(fingerprint, None)
+        self._entries[fingerprint] = (ad_id, now)
+        self._evict(now)
+        return None
+
+    def entries(self) -> Collection[tuple[int, tuple[int, float]]]:
+        return self._entries.items()
+
+    def evict_oldest(self, count: int) -> int:
+        evicted = list(self._entries)[:count]
+        for fingerprint in evicted:
+            self._entries.pop(fingerprint, None)
+        return len(evicted)
+
+    def _evict(self, now: float) -> None:
+        expired: list[int] = []
+        for fingerprint, (_, seen_at) in self._entries.items():
+            if now - seen_at <= self.window_seconds:
+                break
+            expired.append(fingerprint)
+        for fingerprint in expired:
+            self._entries.pop(fingerprint, None)
+
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for fingerprint in list(self._entries)[:overflow]:
+                self._entries.pop(fingerprint, None)
@@ -0,0 +1,144 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Awaitable, Callable
+
+
+@dataclass(frozen=True, slots=True)
+class LagEvent:
+    happened_at: float
+    lag: float
+    culprit: str
+
+
+def _describe_stack(thread_id: int) -> tuple[str, str]:
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return "неизвестно", ""
+
+    culprit = ""
+    cursor = frame
+    while cursor is not None:
+        if cursor.f_code.co_flags & inspect.CO_COROUTINE:
+            culprit = f"{cursor.f_code.co_name} ({cursor.f_code.co_filename}:{cursor.f_lineno})"
+            break
+        cursor = cursor.f_back
+    if not culprit:
+        culprit = f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})"
+    stack = "".join(traceback.format_stack(frame, limit=12))
+    return culprit, stack
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25, history: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.events: deque[LagEvent] = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.blocked_total = 0.0
+        self.block_count = 0
+        self._last_beat = time.monotonic()
+        self._pending_culprit = ""
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    @property
+    def last_event(self) -> LagEvent | None:
+        return self.events[-1] if self.events else None
+
+    def _watch(self, thread_id: int) -> None:
+        reported_beat = 0.0
+        while not self._stop.wait(self.threshold / 2):
+            last_beat = self._last_beat
+            stalled_for = time.monotonic() - last_beat - self.interval
+            if stalled_for <= self.threshold or reported_beat == last_beat:
+                continue
+            reported_beat = last_beat
+            culprit, stack = _describe_stack(thread_id)
+            self._pending_culprit = culprit
+            logging.warning("Event loop заблокирован %.2f с в %s\n%s", stalled_for, culprit, stack)
+
+    async def run(self) -> None:
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(threading.get_ident(),),
+            name="loop-lag-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+        try:
+            while True:
+                self._last_beat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = time.monotonic() - self._last_beat - self.interval
+                self.max_lag = max(self.max_lag, lag)
+                if lag > self.threshold:
+                    self.block_count += 1
+                    self.blocked_total += lag
+                    culprit, self._pending_culprit = self._pending_culprit or "неизвестно", ""
+                    self.events.append(LagEvent(happened_at=time.time(), lag=lag, culprit=culprit))
+                    logging.warning("Задержка event loop %.2f с (%s)", lag, culprit)
+        finally:
+            self._stop.set()
+
+
+class TaskSupervisor:
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Awaitable[None]],
+        heartbeat: Callable[[], float],
+        stall_timeout: float,
+        check_interval: float = 5.0,
+    ):
+        self.name = name
+        self.factory = factory
+        self.heartbeat = heartbeat
+        self.stall_timeout = stall_timeout
+        self.check_interval = check_interval
+        self.restarts = 0
+        self.last_restart_reason = ""
+        self.task: asyncio.Task | None = None
+
+    def _start(self) -> None:
+        self.task = asyncio.create_task(self.factory(), name=self.name)
+
+    async def _restart(self, reason: str) -> None:
+        self.restarts += 1
+        self.last_restart_reason = reason
+        logging.error("Задача '%s' перезапускается: %s", self.name, reason)
+        if self.task and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._start()
+
+    async def run(self) -> None:
+        self._start()
+        try:
+            while True:
+                await asyncio.sleep(self.check_interval)
+                if self.task.done():
+                    error = None if self.task.cancelled() else self.task.exception()
+                    await self._restart(f"задача завершилась ({error!r})")
+                    continue
+
+                stalled_for = time.monotonic() - self.heartbeat()
+                if stalled_for > self.stall_timeout:
+                    await self._restart(f"нет прогресса {stalled_for:.0f} с")
+        finally:
+            if self.task and not self.task.done():
+                self.task.cancel()
+                try:
+                    await self.task
+                except (asyncio.CancelledError, Exception):
+                    pass
@@ -1,50 +1,374 @@
+import asyncio
+from dataclasses import dataclass, field
 import json
+import os
 from pathlib import Path
 import logging
+from typing import Any, Awaitable, Callable, Collection
 
 from src.app_context import AppContext
+from src.models.search_location import SearchLocation
+from src.models.search_target import SearchTarget
+
+
+def _serialize_target(target: SearchTarget) -> dict[str, Any]:
+    return {
+        "target_id": target.target_id,
+        "name": target.name,
+        "category_id": target.category_id,
+        "extra_params": dict(target.extra_params),
+        "enabled": target.enabled,
+        "locations": [
+            {"rgn": location.rgn, "ar": location.ar, "label": location.label}
+            for location in target.locations
+        ],
+    }
+
+
+def _normalize_record(target_id: int, record: dict[str, Any]) -> dict[str, Any] | None:
+    category_id = int(record.get("category_id", 0))
+    if category_id <= 0:
+        return None
+    return {
+        "target_id": target_id,
+        "name": record.get("name", f"Категория {category_id}"),
+        "category_id": category_id,
+        "extra_params": {str(key): str(value) for key, value in (record.get("extra_params") or {}).items()},
+        "enabled": bool(record.get("enabled", True)),
+        "locations": [
+            {
+                "rgn": location.get("rgn"),
+                "ar": location.get("ar"),
+                "label": location.get("label", "Вся Беларусь"),
+            }
+            for location in record.get("locations") or []
+        ],
+    }
+
+
+def _search_params(record: dict[str, Any]) -> tuple:
+    return record["category_id"], record["extra_params"], record["locations"]
+
+
+def _apply_record(target: SearchTarget, record: dict[str, Any]) -> None:
+    target.name = record["name"]
+    target.category_id = record["category_id"]
+    target.extra_params = dict(record["extra_params"])
+    target.enabled = record["enabled"]
+    target.locations = [
+        SearchLocation(rgn=location["rgn"], ar=location["ar"], label=location["label"])
+        for location in record["locations"]
+    ]
+
+
+@dataclass
+class TargetsDiff:
+    added: list[SearchTarget] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    rebaseline: list[SearchTarget] = field(default_factory=list)
+    updated: list[SearchTarget] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.rebaseline or self.updated)
+
+    def summary(self) -> str:
+        return (
+            f"+{len(self.added)} -{len(self.removed)} "
+            f"~{len(self.rebaseline)} (с новым baseline) ~{len(self.updated)}"
+        )
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with temp_path.open("w", encoding="utf-8") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def _append_lines(path: Path, lines: list[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as file:
+        file.write("".join(f"{line}\n" for line in lines))
+        file.flush()
+        os.fsync(file.fileno())
 
 
 class TargetStorage:
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, debounce: float = 1.0, compact_after: int = 200):
         self.path = Path(filepath)
+        self.journal_path = self.path.with_name(f"{self.path.name}.journal")
+        self.debounce = debounce
+        self.compact_after = compact_after
+        self._persisted: dict[int, dict[str, Any]] = {}
+        self._journal_entries = 0
+        self._rekeyed = False
+        self._context: AppContext | None = None
+        self._pending: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._signature: tuple | None = None
+        self._dirty = False
+        self._watching = False
 
-    def load(self, context: AppContext) -> None:
-        if not self.path.exists():
-            return
-
-        try:
-            raw = json.loads(self.path.read_text(encoding="utf-8"))
-        except Exception as error:
-            logging.warning("Не удалось прочитать %s: %s", self.path, error)
-            return
+    def _file_signature(self) -> tuple:
+        signature = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
 
-        targets = raw.get("targets", [])
-        for target in targets:
+    def _read_records(
+        self,
+        strict: bool = False,
+        reserved: Collection[int] = (),
+        use_journal: bool = True,
+    ) -> dict[int, dict[str, Any]]:
+        records: dict[int, dict[str, Any]] = {}
+        unassigned: list[dict[str, Any]] = []
+        if self.path.exists():
             try:
-                category_id = int(target.get("category_id", 0))
-                if category_id <= 0:
+                raw = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as error:
+                if strict:
+                    raise
+                logging.warning("Не удалось прочитать %s: %s", self.path, error)
+                raw = {}
+            for target in raw.get("targets", []):
+                if not isinstance(target, dict):
+                    continue
+                try:
+                    target_id = int(target.get("target_id") or 0)
+                except (TypeError, ValueError) as error:
+                    logging.warning("Пропущена битая запись target в %s: %s", self.path, error)
                     continue
-                created = context.add_target(
-                    name=target.get("name", f"Категория {category_id}"),
-                    category_id=category_id,
-                    extra_params=target.get("extra_params") or {},
-                )
-                created.enabled = bool(target.get("enabled", True))
+                if target_id > 0 and target_id not in records:
+                    records[target_id] = target
+                else:
+                    unassigned.append(target)
+
+        self._journal_entries = 0
+        if use_journal and self.journal_path.exists():
+            for line in self.journal_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                    if entry["op"] == "put":
+                        records[int(entry["target"]["target_id"])] = entry["target"]
+                    elif entry["op"] == "remove":
+                        records.pop(int(entry["target_id"]), None)
+                    self._journal_entries += 1
+                except Exception as error:
+                    logging.warning("Пропущена битая запись журнала %s: %s", self.journal_path, error)
+
+        # Записи без target_id (или с повтором) получают новый id: номер позиции мог принадлежать другому target.
+        next_id = max([*records, *reserved], default=0) + 1
+        for target in unassigned:
+            records[next_id] = target
+            next_id += 1
+        self._rekeyed = bool(unassigned)
+        return records
+
+    def _normalize_records(self, records: dict[int, dict[str, Any]]) -> dict[int, dict[str, Any]]:
+        normalized: dict[int, dict[str, Any]] = {}
+        for target_id, target in records.items():
+            try:
+                record = _normalize_record(target_id, target)
             except Exception as error:
                 logging.warning("Пропущена битая запись target в %s: %s", self.path, error)
+                continue
+            if record:
+                normalized[target_id] = record
+        return normalized
 
-    def save(self, context: AppContext) -> None:
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        payload = {
-            "targets": [
-                {
-                    "name": target.name,
-                    "category_id": target.category_id,
-                    "extra_params": target.extra_params,
-                    "enabled": target.enabled,
-                }
-                for target in context.targets.values()
+    def _drop_journal(self) -> None:
+        self.journal_path.unlink(missing_ok=True)
+        self._journal_entries = 0
+        self._signature = self._file_signature()
+
+    def load(self, context: AppContext) -> None:
+        self._context = context
+        self._signature = self._file_signature()
+        # Журнал дописывается только после нашей последней записи файла; если файл новее,
+        # его правили руками, и журнал устарел.
+        file_signature, journal_signature = self._signature
+        stale_journal = bool(file_signature and journal_signature and file_signature[0] > journal_signature[0])
+        records = self._read_records(use_journal=not stale_journal)
+        if stale_journal:
+            logging.warning("%s новее журнала, журнал отброшен", self.path)
+            self._drop_journal()
+        for target_id, record in self._normalize_records(records).items():
+            created = context.add_target(
+                name=record["name"],
+                category_id=record["category_id"],
+                target_id=target_id,
+            )
+            _apply_record(created, record)
+
+        self._persisted = {target.target_id: _serialize_target(target) for target in context.targets.values()}
+        if self._rekeyed:
+            # Выданные id сразу пишем в файл, иначе следующее чтение раздало бы их заново.
+            try:
+                self._write(self._persisted, [], compact=True)
+            except OSError as error:
+                logging.error("Не удалось сохранить %s: %s", self.path, error)
+            self._journal_entries = 0
+
+    async def reload(self, context: AppContext) -> TargetsDiff | None:
+        signature = await asyncio.to_thread(self._file_signature)
+        if signature == self._signature:
+            return None
+
+        async with self._lock:
+            # Свои записи обновляют self._signature, значит targets.json изменён снаружи. Пока
+            # правка не перечитана, flush() журнал не дописывает, поэтому все его записи
+            # старше правки: файл главнее, журнал отбрасываем.
+            external_edit = self._signature is None or signature[0] != self._signature[0]
+            try:
+                reserved = {*self._persisted, *context.targets}
+                records = await asyncio.to_thread(self._read_records, True, reserved, not external_edit)
+            except Exception as error:
+                # Редактор мог записать файл не целиком: ждём следующего изменения.
+                logging.warning("Не удалось перечитать %s: %s", self.path, error)
+                self._signature = signature
+                return None
+            self._signature = signature
+            records = self._normalize_records(records)
+            try:
+                if self._rekeyed:
+                    await asyncio.to_thread(self._write, records, [], True)
+                    self._journal_entries = 0
+                elif external_edit and signature[1] is not None:
+                    await asyncio.to_thread(self._drop_journal)
+            except OSError as error:
+                logging.error("Не удалось сохранить %s: %s", self.path, error)
+
+            # Сравниваем с последним известным состоянием файла, а не с памятью:
+            # несохранённые правки из бота не откатываются, а допишутся следующим flush.
+            diff = TargetsDiff()
+            for target_id in self._persisted:
+                if target_id not in records and context.remove_target(target_id):
+                    diff.removed.append(target_id)
+
+            for target_id, record in records.items():
+                previous = self._persisted.get(target_id)
+                if previous == record:
+                    continue
+                target = context.targets.get(target_id)
+                if target is None:
+                    target = context.add_target(
+                        name=record["name"],
+                        category_id=record["category_id"],
+                        target_id=target_id,
+                    )
+                    _apply_record(target, record)
+                    diff.added.append(target)
+                    continue
+
+                params_changed = _search_params(_serialize_target(target)) != _search_params(record)
+                resumed = not target.enabled and record["enabled"]
+                _apply_record(target, record)
+                if params_changed or resumed:
+                    diff.rebaseline.append(target)
+                else:
+                    diff.updated.append(target)
+
+            self._persisted = records
+        return diff
+
+    async def watch(
+        self,
+        context: AppContext,
+        on_change: Callable[[TargetsDiff], Awaitable[None]],
+        interval: float = 2.0,
+    ) -> None:
+        self._watching = True
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                diff = await self.reload(context)
+                if diff:
+                    logging.info("%s изменён снаружи: %s", self.path, diff.summary())
+                    await on_change(diff)
+                if self._dirty:
+                    self.schedule_save(context)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Ошибка при перечитывании %s", self.path)
+
+    def schedule_save(self, context: AppContext) -> None:
+        self._context = context
+        # Запрос во время идущей записи не теряется: _flush_later сделает ещё один проход.
+        self._dirty = True
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            self._dirty = False
+            await self.flush()
+
+    def _write(self, records: dict[int, dict[str, Any]], journal_lines: list[str], compact: bool = False) -> bool:
+        compacted = (
+            compact
+            or not self.path.exists()
+            or self._journal_entries + len(journal_lines) > self.compact_after
+        )
+        if compacted:
+            payload = {"targets": list(records.values())}
+            _write_atomic(self.path, json.dumps(payload, ensure_ascii=False, indent=2))
+            self.journal_path.unlink(missing_ok=True)
+        else:
+            _append_lines(self.journal_path, journal_lines)
+        # Собственная запись не должна восприниматься watch() как внешняя правка.
+        self._signature = self._file_signature()
+        return compacted
+
+    async def flush(self, compact: bool = False) -> None:
+        if self._context is None:
+            return
+        async with self._lock:
+            if self._watching and await asyncio.to_thread(self._file_signature) != self._signature:
+                # Файл изменён снаружи и ещё не перечитан: сначала reload(), потом запись.
+                self._dirty = True
+                return
+            records = {target.target_id: _serialize_target(target) for target in self._context.targets.values()}
+            journal_lines = [
+                json.dumps({"op": "put", "target": record}, ensure_ascii=False)
+                for target_id, record in records.items()
+                if self._persisted.get(target_id) != record
             ]
-        }
-        self.path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+            journal_lines.extend(
+                json.dumps({"op": "remove", "target_id": target_id})
+                for target_id in self._persisted
+                if target_id not in records
+            )
+            if not journal_lines and self.path.exists() and not (compact and self.journal_path.exists()):
+                return
+
+            try:
+                compacted = await asyncio.to_thread(self._write, records, journal_lines, compact)
+            except Exception as error:
+                logging.error("Не удалось сохранить %s: %s", self.path, error)
+                return
+            self._journal_entries = 0 if compacted else self._journal_entries + len(journal_lines)
+            self._persisted = records
+
+    async def close(self) -> None:
+        if self._pending and not self._pending.done():
+            if not self._lock.locked():
+                self._pending.cancel()
+            try:
+                await self._pending
+            except asyncio.CancelledError:
+                pass
+        if self._watching and self._context is not None:
+            await self.reload(self._context)
+        # При остановке сворачиваем журнал: файл, который правят без бота, должен быть полным.
+        await self.flush(compact=True)
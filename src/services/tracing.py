@@ -0,0 +1,74 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+import time
+from typing import Iterator
+
+
+@dataclass(slots=True)
+class SpanStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = True
+        self.stages: dict[str, SpanStats] = {}
+        self.by_target: dict[int, dict[str, SpanStats]] = {}
+        self._captures: list[dict[str, SpanStats]] = []
+
+    @contextmanager
+    def span(self, stage: str, target_id: int | None = None) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, target_id)
+
+    def record(self, stage: str, duration: float, target_id: int | None = None) -> None:
+        self.stages.setdefault(stage, SpanStats()).add(duration)
+        if target_id is not None:
+            self.by_target.setdefault(target_id, {}).setdefault(stage, SpanStats()).add(duration)
+        for capture in self._captures:
+            capture.setdefault(stage, SpanStats()).add(duration)
+
+    @contextmanager
+    def capture(self) -> Iterator[dict[str, SpanStats]]:
+        stats: dict[str, SpanStats] = {}
+        self._captures.append(stats)
+        try:
+            yield stats
+        finally:
+            self._captures.remove(stats)
+
+    def forget_target(self, target_id: int) -> None:
+        self.by_target.pop(target_id, None)
+
+    def target_totals(self) -> list[tuple[int, float]]:
+        totals = [
+            (target_id, sum(stats.total for stats in stages.values()))
+            for target_id, stages in self.by_target.items()
+        ]
+        return sorted(totals, key=lambda item: item[1], reverse=True)
+
+    @staticmethod
+    def slowest(stages: dict[str, SpanStats], limit: int = 10) -> list[tuple[str, SpanStats]]:
+        return sorted(stages.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+
+
+tracer = Tracer()
@@ -0,0 +1,138 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import gzip
+import logging
+from pathlib import Path
+import struct
+import threading
+import time
+from typing import Iterator
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from src.services.transport import Transport, TransportResponse
+
+RECORD_HEADER = struct.Struct("<dfHII")
+FLUSH_EVERY = 20
+
+
+@dataclass(frozen=True, slots=True)
+class CassetteRecord:
+    offset: float
+    elapsed: float
+    status: int
+    url: str
+    body: bytes
+
+    @property
+    def is_search(self) -> bool:
+        return "/search-api/" in self.url
+
+
+def normalize_url(url: str) -> str:
+    parsed = urlparse(url)
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return parsed._replace(query=query, fragment="").geturl()
+
+
+def read_cassette(path: str) -> Iterator[CassetteRecord]:
+    with gzip.open(path, "rb") as file:
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            offset, elapsed, status, url_length, body_length = RECORD_HEADER.unpack(header)
+            url = file.read(url_length).decode("utf-8")
+            body = file.read(body_length)
+            if len(body) < body_length:
+                return
+            yield CassetteRecord(offset=offset, elapsed=elapsed, status=status, url=url, body=body)
+
+
+def _write_records(path: Path, records: list[CassetteRecord]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "ab") as file:
+        for record in records:
+            url = record.url.encode("utf-8")
+            file.write(RECORD_HEADER.pack(record.offset, record.elapsed, record.status, len(url), len(record.body)))
+            file.write(url)
+            file.write(record.body)
+
+
+class RecordingTransport:
+    def __init__(self, inner: Transport, path: str):
+        self.inner = inner
+        self.path = Path(path)
+        self._started_at = time.monotonic()
+        self._buffer: list[CassetteRecord] = []
+        # Поток записи переживает отмену flush(): без блокировки второй flush дописал бы
+        # gzip-член в тот же файл параллельно с первым и испортил кассету.
+        self._write_lock = threading.Lock()
+
+    async def get(self, url: str) -> TransportResponse:
+        started = time.monotonic()
+        response = await self.inner.get(url)
+        self._buffer.append(
+            CassetteRecord(
+                offset=started - self._started_at,
+                elapsed=time.monotonic() - started,
+                status=response.status,
+                url=url,
+                body=response.body,
+            )
+        )
+        if len(self._buffer) >= FLUSH_EVERY:
+            await self.flush()
+        return response
+
+    async def head(self, url: str, timeout: float) -> TransportResponse:
+        return await self.inner.head(url, timeout)
+
+    async def flush(self) -> None:
+        records, self._buffer = self._buffer, []
+        if not records:
+            return
+        try:
+            await asyncio.to_thread(self._write_records, records)
+        except Exception as error:
+            logging.error("Не удалось записать кассету %s: %s", self.path, error)
+
+    def _write_records(self, records: list[CassetteRecord]) -> None:
+        with self._write_lock:
+            _write_records(self.path, records)
+
+    async def close(self) -> None:
+        await self.flush()
+        await self.inner.close()
+
+
+class ReplayTransport:
+    def __init__(self, path: str, speed: float = 1.0):
+        self.speed = speed
+        self.records = list(read_cassette(path))
+        self._by_url: dict[str, deque[CassetteRecord]] = {}
+        self._last_by_url: dict[str, CassetteRecord] = {}
+        for record in self.records:
+            self._by_url.setdefault(normalize_url(record.url), deque()).append(record)
+
+    @property
+    def search_urls(self) -> list[str]:
+        return list(dict.fromkeys(record.url for record in self.records if record.is_search))
+
+    async def get(self, url: str) -> TransportResponse:
+        key = normalize_url(url)
+        queue = self._by_url.get(key)
+        record = queue.popleft() if queue else self._last_by_url.get(key)
+        if record is None:
+            return TransportResponse(status=404, body=b"")
+
+        self._last_by_url[key] = record
+        if self.speed > 0:
+            await asyncio.sleep(record.elapsed / self.speed)
+        return TransportResponse(status=record.status, body=record.body)
+
+    async def head(self, url: str, timeout: float) -> TransportResponse:
+        return TransportResponse(status=200, body=b"", content_type="image/jpeg")
+
+    async def close(self) -> None:
+        return None
@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from typing import Protocol
+from urllib.parse import urlparse
+
+import aiohttp
+
+
+@dataclass(frozen=True, slots=True)
+class TransportResponse:
+    status: int
+    body: bytes
+    content_type: str = ""
+    content_length: int | None = None
+
+
+class Transport(Protocol):
+    async def get(self, url: str) -> TransportResponse: ...
+
+    async def head(self, url: str, timeout: float) -> TransportResponse: ...
+
+    async def close(self) -> None: ...
+
+
+AUTH_HEADERS = frozenset({"authorization", "cookie"})
+AUTH_HOST_SUFFIX = "kufar.by"
+
+
+def _is_kufar_host(url: str) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return host == AUTH_HOST_SUFFIX or host.endswith(f".{AUTH_HOST_SUFFIX}")
+
+
+class HttpTransport:
+    def __init__(self, headers: dict[str, str]):
+        self._session: aiohttp.ClientSession | None = None
+        # Токен Kufar не кладём в заголовки сессии: через неё же идут HEAD-проверки фото,
+        # а ссылки на фото берутся из объявлений и могут вести на любой хост.
+        self._headers = {key: value for key, value in headers.items() if key.lower() not in AUTH_HEADERS}
+        self._auth_headers = {key: value for key, value in headers.items() if key.lower() in AUTH_HEADERS}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=self._headers)
+        return self._session
+
+    async def get(self, url: str) -> TransportResponse:
+        session = await self.get_session()
+        headers = self._auth_headers if _is_kufar_host(url) else None
+        async with session.get(url, headers=headers) as response:
+            body = await response.read() if response.status == 200 else b""
+            return TransportResponse(status=response.status, body=body)
+
+    async def head(self, url: str, timeout: float) -> TransportResponse:
+        session = await self.get_session()
+        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with session.head(url, timeout=request_timeout, allow_redirects=True) as response:
+            return TransportResponse(
+                status=response.status,
+                body=b"",
+                content_type=response.content_type,
+                content_length=response.content_length,
+            )
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()